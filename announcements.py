@@ -1,48 +1,63 @@
-import os
-import json
 import uuid
 from datetime import datetime, timezone
+from typing import Optional, Tuple, List, Dict
 
-ANN_PATH = os.path.join(os.path.dirname(__file__), "announcements.json")
-
-def _ensure_file():
-    if not os.path.exists(ANN_PATH):
-        with open(ANN_PATH, "w", encoding="utf-8") as f:
-            json.dump({"announcements": [
-                {
-                    "id": "seed",
-                    "text": "Welcome to STAGE Inventory! Use this board for quick updates.",
-                    "author": "System",
-                    "ts": datetime.now(timezone.utc).isoformat()
-                }
-            ]}, f, indent=2)
-
-def _load() -> dict:
-    _ensure_file()
-    with open(ANN_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def _save(data: dict):
-    with open(ANN_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+import perf
+from inventory_db import connection
 
+# Announcements live in the announcements table of the inventory database,
+# indexed on (ts, id): reading the latest posts or paging back through the
+# history is an index range scan, and every write is a single-row statement.
+
+def _rows(cur) -> List[Dict[str, str]]:
+    return [dict(r) for r in cur.fetchall()]
+
+@perf.timed
 def load_announcements(limit: int | None = 5):
-    data = _load()
-    anns = data.get("announcements", [])
-    anns.sort(key=lambda a: a.get("ts", ""), reverse=True)
-    return anns[:limit] if limit else anns
+    with connection() as conn:
+        if limit:
+            cur = conn.execute(
+                "SELECT id, text, author, ts FROM announcements ORDER BY ts DESC, id DESC LIMIT ?",
+                (limit,),
+            )
+        else:
+            cur = conn.execute("SELECT id, text, author, ts FROM announcements ORDER BY ts DESC, id DESC")
+        return _rows(cur)
+
+@perf.timed
+def load_announcements_page(before: Optional[Tuple[str, str]] = None, page_size: int = 20):
+    """Return ``(posts, next_before)``: posts older than ``before``, newest first.
+
+    ``before`` is the ``(ts, id)`` of the last post already shown (None for the
+    newest page); ``next_before`` is None once the history is exhausted.
+    """
+    with connection() as conn:
+        if before:
+            cur = conn.execute(
+                "SELECT id, text, author, ts FROM announcements WHERE (ts, id) < (?, ?)"
+                " ORDER BY ts DESC, id DESC LIMIT ?",
+                (before[0], before[1], page_size + 1),
+            )
+        else:
+            cur = conn.execute(
+                "SELECT id, text, author, ts FROM announcements ORDER BY ts DESC, id DESC LIMIT ?",
+                (page_size + 1,),
+            )
+        posts = _rows(cur)
+    if len(posts) > page_size:
+        posts = posts[:page_size]
+        return posts, (posts[-1]["ts"], posts[-1]["id"])
+    return posts, None
 
+@perf.timed
 def add_announcement(text: str, author: str):
-    data = _load()
-    data.setdefault("announcements", []).append({
-        "id": uuid.uuid4().hex,
-        "text": text,
-        "author": author,
-        "ts": datetime.now(timezone.utc).isoformat()
-    })
-    _save(data)
+    with connection() as conn:
+        conn.execute(
+            "INSERT INTO announcements(id, text, author, ts) VALUES (?, ?, ?, ?)",
+            (uuid.uuid4().hex, text, author, datetime.now(timezone.utc).isoformat()),
+        )
 
+@perf.timed
 def delete_announcement(ann_id: str):
-    data = _load()
-    data["announcements"] = [a for a in data.get("announcements", []) if a.get("id") != ann_id]
-    _save(data)
\ No newline at end of file
+    with connection() as conn:
+        conn.execute("DELETE FROM announcements WHERE id = ?", (ann_id,))
@@ -1,13 +1,27 @@
+import time
+RUN_START = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
 import os
-from inventory_db import init_db, add_item, update_item, list_items, get_item, set_in_use, get_locations, get_tags, get_categories, delete_item, add_location
+import uuid
+from collections import deque
+import perf
+from inventory_db import init_db, add_item, add_items_bulk, update_item, list_items, list_items_page, search_items, fuzzy_search, start_trigram_sync, trigram_index_building, refresh_items, current_version, get_item, set_in_use, set_in_use_many, get_locations, get_tags, get_categories, get_rollup, get_inventory_summary, get_utilization, get_checkout_series, start_usage_sync, get_checked_out, delete_item, add_location, rename_location, rename_category, rename_crew_tag
 from auth import login, logout, is_admin, current_user, current_role
-from announcements import load_announcements, add_announcement, delete_announcement
-from item_images import get_item_image, has_item_image, save_item_image, remove_item_image
+from announcements import load_announcements, load_announcements_page, add_announcement, delete_announcement
+from item_images import get_item_image, save_item_image, remove_item_image, prune_image_cache, adopt_legacy_images, collect_unused_images
+from snapshots import restore_if_missing, start_scheduler, take_snapshot, list_snapshots, last_snapshot_failure
+# Import/export modules are loaded by the pages that use them
+
+# Only the first run in a process pays for these; later runs find them in sys.modules
+IMPORTS_MS = (time.perf_counter() - RUN_START) * 1000
 
 st.set_page_config(page_title="STAGE Inventory", page_icon="🎭", layout="wide")
 
+# Opt-in instrumentation: samples from this rerun are grouped under the session
+perf_session = st.session_state.setdefault("perf_session", uuid.uuid4().hex)
+perf.begin_run(perf_session)
+
 # Make select dropdowns taller and scrollable
 st.markdown("""
 <style>
@@ -18,16 +32,56 @@ div[data-baseweb="select"] div[role="listbox"] {
 </style>
 """, unsafe_allow_html=True)
 
-# Ensure DB exists
-init_db()
+@st.cache_resource(show_spinner=False)
+def startup():
+    # Once per process, shared by every session: returns how long each step took (ms)
+    steps = {"imports": IMPORTS_MS}
+    for name, fn in (
+        # Bring back the latest snapshot if the database was lost (e.g. the host was reset)
+        ("restore snapshot", restore_if_missing),
+        # Ensure DB exists
+        ("init_db", init_db),
+        ("snapshot scheduler", start_scheduler),
+        # Fuzzy search index: built or caught up in the background, in short writer steps
+        ("trigram index", start_trigram_sync),
+        # Utilization rollups: new check-outs are folded in every minute, off the report path
+        ("usage sync", start_usage_sync),
+    ):
+        start = time.perf_counter()
+        fn()
+        steps[name] = (time.perf_counter() - start) * 1000
+    for name, ms in steps.items():
+        perf.record(f"startup:{name}", ms)
+    return steps
+
+@st.cache_resource(show_spinner=False)
+def first_renders():
+    # Time to first render (ms) of recent sessions in this process
+    return deque(maxlen=100)
+
+@st.cache_resource(show_spinner=False)
+def logo_bytes():
+    with open("logo.png", "rb") as f:
+        return f.read()
+
+def note_first_render():
+    # Called where a run ends; only a session's first run is recorded
+    if "first_render_ms" not in st.session_state:
+        ms = (time.perf_counter() - RUN_START) * 1000
+        st.session_state["first_render_ms"] = ms
+        first_renders().append(ms)
+        perf.record("startup:first render", ms)
+
+startup_steps = startup()
 
 # Require authentication before showing the app
 if not login():
+    note_first_render()
     st.stop()
 
 # Presets
 def current_locations():
-    # Pull from DB each run to include any user-added locations
+    # Served from the shared catalog cache; refreshed as soon as a location is added
     locs = get_locations()
     if not locs:
         return [
@@ -47,6 +101,45 @@ PRESET_TAGS = [
     "Theatre Class Usage",
 ]
 
+# Display widths (px) used to pick the smallest cached image variant that fits
+FULL_IMAGE_WIDTH = 1000
+EDIT_IMAGE_WIDTH = 220
+PREVIEW_IMAGE_WIDTH = 480
+
+# Result views. The grid is one st.dataframe however many rows there are; the
+# row view builds widgets per row, so it is only offered for short results.
+RESULT_VIEWS = ["Grid", "Rows"]
+ROW_VIEW_MAX_ROWS = 50
+GRID_COLUMNS = {
+    "id": st.column_config.NumberColumn("ID", format="%d", width="small"),
+    "name": st.column_config.TextColumn("Name", width="large"),
+    "category": "Category",
+    "crew_tag": "Crew Tag",
+    "location": "Location",
+    "in_use": st.column_config.CheckboxColumn("In Use", width="small"),
+    "has_image": st.column_config.CheckboxColumn("Image", width="small"),
+}
+
+# Matches offered by the Edit Item search box
+EDIT_SEARCH_LIMIT = 20
+
+# Utilization report windows (seconds)
+USAGE_PERIODS = {
+    "Last 24 hours": 24 * 3600,
+    "Last 7 days": 7 * 86400,
+    "Last 30 days": 30 * 86400,
+    "Last 365 days": 365 * 86400,
+}
+USAGE_TOP_ITEMS = 50
+
+SORT_OPTIONS = {
+    "Name": "name",
+    "Category": "category",
+    "Crew Tag": "crew_tag",
+    "Location": "location",
+    "In Use": "in_use",
+}
+
 PRESET_CATEGORIES = [
     "Props",
     "Costumes",
@@ -57,8 +150,18 @@ PRESET_CATEGORIES = [
     "General",
 ]
 
+def with_presets(presets, in_use):
+    # Presets first, then values only items use (e.g. renamed ones), so every item's value is selectable
+    return presets + sorted(set(in_use) - set(presets), key=str.lower)
+
+def current_categories():
+    return with_presets(PRESET_CATEGORIES, get_categories())
+
+def current_tags():
+    return with_presets(PRESET_TAGS, get_tags())
+
 # Sidebar navigation (role-aware)
-st.sidebar.image("logo.png", width=216)  # small logo above the title
+st.sidebar.image(logo_bytes(), width=216)  # small logo above the title
 st.sidebar.title("STAGE Inventory")
 st.sidebar.caption(f"Signed in as: {current_user()} ({current_role()})")
 
@@ -67,11 +170,18 @@ if st.sidebar.button("Log out"):
     st.rerun()
 
 # Moved announcements below the navigation radio
-guest_pages = ["Browse & Filter", "Location Report"]
-admin_pages = guest_pages + ["Add Item", "Edit Item"]
+guest_pages = ["Browse & Filter", "Location Report", "Dashboard"]
+admin_pages = guest_pages + ["Add Item", "Edit Item", "Bulk Import", "Utilization"]
 available_pages = admin_pages if is_admin() else guest_pages
 
-page = st.sidebar.radio("Navigate", available_pages)  # SC1, SC2, SC4, SC5
+if st.session_state.get("nav") not in available_pages:
+    # First run of the session (or the role changed): a deep link (?item=<id>) opens Edit Item
+    deep_link = is_admin() and st.query_params.get("item", "").isdigit()
+    st.session_state["nav"] = "Edit Item" if deep_link else available_pages[0]
+page = st.sidebar.radio("Navigate", available_pages, key="nav")  # SC1, SC2, SC4, SC5
+if page != "Edit Item" and is_admin() and "item" in st.query_params:
+    # The item link belongs to Edit Item; don't carry it to other pages
+    del st.query_params["item"]
 
 # STAGE Announcements (in sidebar, now below navigation)
 with st.sidebar.expander("STAGE Announcements", expanded=True):
@@ -87,6 +197,24 @@ with st.sidebar.expander("STAGE Announcements", expanded=True):
     else:
         st.caption("No announcements yet.")
 
+    if anns and st.toggle("Show older posts", key="ann_history"):
+        # Keyset paging back through the history, newest first, skipping the 5 shown above
+        pages = st.session_state.setdefault("ann_pages", [(anns[-1]["ts"], anns[-1]["id"])])
+        older, next_before = load_announcements_page(pages[-1], page_size=10)
+        for a in older:
+            st.markdown(f"- {a['text']}  \n  ⸺ {a.get('author', 'Unknown')} · {a['ts'][:10]}")
+        if not older:
+            st.caption("No older posts.")
+        h1, h2 = st.columns(2)
+        if h1.button("Newer", disabled=len(pages) == 1, key="ann_newer"):
+            pages.pop()
+            st.rerun()
+        if h2.button("Older", disabled=next_before is None, key="ann_older"):
+            pages.append(next_before)
+            st.rerun()
+    else:
+        st.session_state.pop("ann_pages", None)
+
     if is_admin():
         with st.form("post_announcement_sidebar", clear_on_submit=True):
             new_text = st.text_input("Post an update", placeholder="Short announcement...")
@@ -109,10 +237,31 @@ if is_admin():
                 ("LED Par Can", "Lighting", "Lights", "West Campus Basement Storage", False),
                 ("Sawhorse", "Set Pieces", "Set", "East Campus Basement Storage", False),
             ]
-            for n, c, t, l, u in sample:
-                add_item(n, c, t, l, u)
+            add_items_bulk(
+                {"name": n, "category": c, "crew_tag": t, "location": l, "in_use": u}
+                for n, c, t, l, u in sample
+            )
             st.success("Sample items added.")
 
+        if st.button("Clean up images"):
+            adopted = adopt_legacy_images()
+            unused = collect_unused_images()
+            removed = prune_image_cache()
+            st.success(
+                f"Deduplicated {adopted} older image(s); deleted {unused} unused image(s)"
+                f" and {removed} unused cached image(s)."
+            )
+
+        if st.button("Take snapshot now"):
+            snap = take_snapshot()
+            st.success(f"Saved {snap['name']} ({snap['images_copied']} new image(s) copied).")
+        snaps = list_snapshots()
+        if snaps:
+            st.caption(f"{len(snaps)} snapshot(s); latest {snaps[0]['name']} ({snaps[0]['size'] / 1e6:.1f} MB)")
+        failure = last_snapshot_failure()
+        if failure:
+            st.warning(f"The scheduled snapshot at {failure['at']} failed: {failure['error']}")
+
         st.divider()
         new_loc = st.text_input("Add a new location")
         if st.button("Add Location"):
@@ -123,6 +272,98 @@ if is_admin():
                 st.success(f"Added location: {new_loc.strip()}")
                 st.rerun()
 
+        st.divider()
+        renames = {
+            "Location": (get_locations, rename_location),
+            "Category": (get_categories, rename_category),
+            "Crew tag": (get_tags, rename_crew_tag),
+        }
+        rename_kind = st.selectbox("Rename a", list(renames))
+        values, rename = renames[rename_kind]
+        rename_old = st.selectbox("Current name", values(), key="rename_old")
+        rename_new = st.text_input("New name", key="rename_new")
+        if st.button("Rename") and rename_old:
+            try:
+                rename(rename_old, rename_new)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.success(f"Renamed {rename_old} to {rename_new.strip()}")
+                st.rerun()
+
+    with st.sidebar.expander("Performance"):
+        st.caption("Startup (this process, ms)")
+        st.dataframe(
+            [{"step": name, "ms": round(ms, 1)} for name, ms in startup_steps.items()],
+            hide_index=True,
+            use_container_width=True,
+        )
+        renders = sorted(first_renders())
+        if renders:
+            st.caption(
+                f"First render: median {renders[len(renders) // 2]:.0f} ms, slowest {renders[-1]:.0f} ms"
+                f" (last {len(renders)} sessions)"
+            )
+        collect = st.checkbox("Collect timings", value=perf.ENABLED)
+        if collect != perf.ENABLED:
+            perf.enable(collect)
+            st.rerun()
+        if perf.ENABLED:
+            last = perf.last_run(perf_session)
+            st.caption("Previous rerun (this session)")
+            if last:
+                st.dataframe(last, hide_index=True, use_container_width=True)
+            else:
+                st.caption("Nothing recorded yet.")
+            st.caption("Since startup (all sessions)")
+            st.dataframe(perf.summary(), hide_index=True, use_container_width=True)
+            b1, b2 = st.columns(2)
+            if b1.button("Dump to JSONL"):
+                path = perf.dump_jsonl(session_key=perf_session)
+                st.success(f"Appended to {path}")
+            if b2.button("Reset"):
+                perf.reset()
+                st.rerun()
+
+def render_results(rows, view, key):
+    if view == "Rows" and len(rows) <= ROW_VIEW_MAX_ROWS:
+        render_rows_with_image_buttons(rows)
+        return
+    if view == "Rows":
+        st.caption(f"More than {ROW_VIEW_MAX_ROWS} results: showing the grid.")
+    render_results_grid(rows, key)
+
+def render_results_grid(rows, key):
+    if not rows:
+        st.info("No items match the current filters.")
+        return
+
+    grid_col, preview_col = st.columns([3, 1])
+    with grid_col:
+        event = st.dataframe(
+            [{c: r.get(c) for c in GRID_COLUMNS} for r in rows],
+            column_config=GRID_COLUMNS,
+            column_order=list(GRID_COLUMNS),
+            hide_index=True,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=key,
+        )
+    with preview_col:
+        selected = event.selection.rows
+        if not selected or selected[0] >= len(rows):
+            st.caption("Select a row to preview its image.")
+            return
+        r = rows[selected[0]]
+        st.markdown(f"**#{r['id']} — {r['name']}**")
+        st.caption(f"{r['category']} · {r['crew_tag']} · {r['location']} · {'In use' if r['in_use'] else 'Available'}")
+        img_path = get_item_image(r["id"], width=PREVIEW_IMAGE_WIDTH) if r["has_image"] else None
+        if img_path:
+            st.image(img_path, use_container_width=True)
+        else:
+            st.caption("No image.")
+
 def render_rows_with_image_buttons(rows):
     if not rows:
         st.info("No items match the current filters.")
@@ -151,8 +392,8 @@ def render_rows_with_image_buttons(rows):
         flag_key = f"show_img_{r['id']}"
         shown = st.session_state.get(flag_key, False)
 
-        if has_item_image(r["id"]):
-            label = "Hide Image" if st.session_state.get(flag_key := f"show_img_{r['id']}", False) else "View Image"
+        if r["has_image"]:
+            label = "Hide Image" if shown else "View Image"
             if cols[6].button(label, key=f"view_image_btn_{r['id']}"):
                 st.session_state[flag_key] = not st.session_state.get(flag_key, False)
                 st.rerun()
@@ -160,10 +401,48 @@ def render_rows_with_image_buttons(rows):
             cols[6].empty()
 
         if st.session_state.get(flag_key):
-            img_path = get_item_image(r["id"])
+            img_path = get_item_image(r["id"], width=FULL_IMAGE_WIDTH)
             if img_path:
                 st.image(img_path, use_container_width=True, caption=f"#{r['id']} — {r['name']}")
 
+def facet_label(facet):
+    # "Props (42)" using the trigger-maintained rollups; one small query per facet
+    counts = {r["value"]: r["items"] for r in get_rollup(facet)}
+    return lambda value: f"{value} ({counts.get(value, 0)})"
+
+def parse_item_ids(text):
+    # Scanner / pasted input: IDs separated by spaces, commas or new lines, "#12" allowed
+    ids = []
+    bad = []
+    for token in text.replace(",", " ").split():
+        token = token.lstrip("#")
+        if token.isdigit():
+            ids.append(int(token))
+        else:
+            bad.append(token)
+    return ids, bad
+
+def render_export_controls(key, filter_kwargs, file_stem):
+    from inventory_export import EXPORT_FORMATS, export_file
+    # The export is only built on request, never on ordinary reruns.
+    c1, c2, c3 = st.columns([2, 2, 3])
+    fmt = c1.selectbox("Export format", options=list(EXPORT_FORMATS.keys()), key=f"{key}_fmt")
+    # A prepared export is held only until it is downloaded or no longer matches
+    # the format and filters, so a large one doesn't stay in memory for the session
+    export_sig = (fmt, repr(filter_kwargs))
+    prepared = st.session_state.get(f"{key}_file")
+    if prepared and (prepared[0] != export_sig or st.session_state.get(f"{key}_download")):
+        del st.session_state[f"{key}_file"]
+        prepared = None
+    if c2.button("Prepare export", key=f"{key}_prepare"):
+        try:
+            prepared = st.session_state[f"{key}_file"] = (export_sig, export_file(fmt, **filter_kwargs))
+        except ImportError:
+            st.error("Parquet export needs the pyarrow package.")
+    if prepared:
+        mime, ext = EXPORT_FORMATS[fmt]
+        c3.download_button(f"Download {fmt.upper()}", data=prepared[1], file_name=f"{file_stem}{ext}", mime=mime, key=f"{key}_download")
+
 if page == "Browse & Filter":  # SC4
     st.header("Browse & Filter")
     st.caption("Search, filter by crew tag/location, and sort results.")
@@ -173,11 +452,15 @@ if page == "Browse & Filter":  # SC4
         with c1:
             search = st.text_input("Search by name")
         with c2:
-            selected_categories = st.multiselect("Categories", options=PRESET_CATEGORIES)
+            selected_categories = st.multiselect(
+                "Categories", options=current_categories(), format_func=facet_label("category")
+            )
         with c3:
-            selected_tags = st.multiselect("Crew tags", options=PRESET_TAGS)
+            selected_tags = st.multiselect("Crew tags", options=current_tags(), format_func=facet_label("crew_tag"))
         with c4:
-            selected_locations = st.multiselect("Locations", options=current_locations())
+            selected_locations = st.multiselect(
+                "Locations", options=current_locations(), format_func=facet_label("location")
+            )
         with c5:
             in_use_filter = st.selectbox("In use?", options=["Any", "Yes", "No"])
 
@@ -189,19 +472,67 @@ if page == "Browse & Filter":  # SC4
         "in_use": None if in_use_filter == "Any" else (in_use_filter == "Yes"),
     }
 
-    sort_by = st.selectbox("Sort by", options=["Name", "Category", "Crew Tag", "Location", "In Use"]) 
-    rows = list_items(**filter_kwargs)
-
-    key_map = {
-        "Name": lambda r: r["name"].lower(),
-        "Category": lambda r: r["category"].lower(),
-        "Crew Tag": lambda r: r["crew_tag"].lower(),
-        "Location": lambda r: r["location"].lower(),
-        "In Use": lambda r: (not r["in_use"])
-    }
-    rows.sort(key=key_map[sort_by])
-
-    render_rows_with_image_buttons(rows)
+    s1, s2, s3, s4, s5 = st.columns([3, 2, 2, 2, 2])
+    with s1:
+        sort_label = st.selectbox("Sort by", options=list(SORT_OPTIONS.keys()))
+    with s2:
+        descending = st.checkbox("Descending", value=sort_label == "In Use")
+    with s3:
+        page_size = st.selectbox("Per page", options=[25, 50, 100, 200, 500, 1000], index=1)
+    with s4:
+        fuzzy = st.checkbox("Fuzzy match", help="Tolerate typos and missing spaces; best matches first.")
+    with s5:
+        view = st.radio("View", options=RESULT_VIEWS, horizontal=True,
+                        help=f"The row view is available for up to {ROW_VIEW_MAX_ROWS} results.")
+
+    if fuzzy and search:
+        # Closest matches by trigram similarity: one ranked page, no sorting or paging
+        rows = fuzzy_search(search, **{k: v for k, v in filter_kwargs.items() if k != "name_query"},
+                            limit=page_size, with_images=True)
+        if trigram_index_building():
+            st.info("The fuzzy search index is still being built; some items may be missing from the matches.")
+        st.caption(f"{len(rows)} closest match(es) for \"{search}\".")
+        render_results(rows, view, key=f"grid_fuzzy_{hash((search, repr(filter_kwargs), page_size))}")
+    else:
+        # Keyset pagination: keep the cursors of the pages already visited so
+        # "Previous" can step back. Any change to the query starts over at page 1.
+        query_sig = repr((filter_kwargs, sort_label, descending, page_size))
+        if st.session_state.get("browse_query") != query_sig:
+            st.session_state["browse_query"] = query_sig
+            st.session_state["browse_cursors"] = [None]
+        cursors = st.session_state["browse_cursors"]
+
+        # Reuse this session's last page while the inventory's change version is unchanged
+        page_key = (query_sig, cursors[-1], current_version())
+        cached_page = st.session_state.get("browse_page")
+        if cached_page and cached_page[0] == page_key:
+            rows, next_cursor = cached_page[1]
+        else:
+            rows, next_cursor = list_items_page(
+                **filter_kwargs,
+                sort_by=SORT_OPTIONS[sort_label],
+                descending=descending,
+                page_size=page_size,
+                cursor=cursors[-1],
+                with_images=True,
+            )
+            st.session_state["browse_page"] = (page_key, (rows, next_cursor))
+
+        # Keyed by query and page so a selection never carries over to other rows
+        render_results(rows, view, key=f"grid_{hash((query_sig, cursors[-1]))}")
+
+        p1, p2, p3 = st.columns([1, 2, 1])
+        if p1.button("Previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+        p2.caption(f"Page {len(cursors)}")
+        if p3.button("Next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+
+    with st.expander("Export all matching items"):
+        st.caption("Leave the filters empty to export the full inventory.")
+        render_export_controls("browse_export", {**filter_kwargs, "sort_by": SORT_OPTIONS[sort_label]}, "inventory_export")
 
 elif page == "Add Item":  # SC1 (admin only)
     if not is_admin():
@@ -210,8 +541,10 @@ elif page == "Add Item":  # SC1 (admin only)
         st.header("Add a New Item")
         with st.form("add_item_form", clear_on_submit=True):
             name = st.text_input("Item name", placeholder="e.g., Mason jar, top hat, XLR cable")
-            category = st.selectbox("Category", options=PRESET_CATEGORIES, index=PRESET_CATEGORIES.index("General"))
-            crew_tag = st.selectbox("Crew tag", options=PRESET_TAGS, index=PRESET_TAGS.index("Props"))
+            cats = current_categories()
+            tags = current_tags()
+            category = st.selectbox("Category", options=cats, index=cats.index("General"))
+            crew_tag = st.selectbox("Crew tag", options=tags, index=tags.index("Props"))
             location = st.selectbox("Location", options=current_locations())
             in_use = st.checkbox("Currently in use?", value=False)
             image_file = st.file_uploader("Optional image", type=["png", "jpg", "jpeg", "webp"])
@@ -222,16 +555,12 @@ elif page == "Add Item":  # SC1 (admin only)
                     st.error("Name is required.")
                 else:
                     # Add item
-                    add_item(name=name.strip(), category=category, crew_tag=crew_tag, location=location, in_use=in_use)
+                    new_id = add_item(name=name.strip(), category=category, crew_tag=crew_tag, location=location, in_use=in_use)
                     st.success(f"Added '{name}' to inventory.")
 
-                    # Find the recently added item id by matching attributes (pick max id)
-                    rows = list_items(name_query=name.strip(), categories=[category], tags=[crew_tag], locations=[location], in_use=in_use)
-                    if rows:
-                        new_id = max(rows, key=lambda r: r["id"])["id"]
-                        if image_file is not None:
-                            save_item_image(new_id, image_file)
-                            st.success("Image saved for the new item.")
+                    if image_file is not None:
+                        save_item_image(new_id, image_file)
+                        st.success("Image saved for the new item.")
 
 elif page == "Edit Item":  # SC2 (admin only)
     if not is_admin():
@@ -239,27 +568,45 @@ elif page == "Edit Item":  # SC2 (admin only)
     else:
         st.header("Edit Item")
 
-        rows = list_items()
-        if not rows:
-            st.info("No items yet. Add your first item in the 'Add Item' page.")
+        # Deep link: ?item=<id> opens that item directly
+        linked = st.query_params.get("item", "")
+        search = st.text_input("Find an item", placeholder="Item ID or the start of its name")
+        if search.strip():
+            matches = search_items(search, limit=EDIT_SEARCH_LIMIT)
+        elif linked.isdigit():
+            linked_item = get_item(int(linked))
+            matches = [linked_item] if linked_item else []
         else:
-            options = {f"#{r['id']} — {r['name']} ({r['category']}) [{r['crew_tag']}] @ {r['location']}": r['id'] for r in rows}
-            selection = st.selectbox("Select an item to edit", options=list(options.keys()))
-            item_id = options[selection]
-            item = get_item(item_id)
+            matches = []
 
-            current_img = get_item_image(item_id)
+        item = None
+        if get_inventory_summary()["items"] == 0:
+            st.info("No items yet. Add your first item in the 'Add Item' page.")
+        elif not matches:
+            st.info("Type an item ID or name to find the item to edit." if not search.strip() else "No matching items.")
+        else:
+            labels = {r["id"]: f"#{r['id']} — {r['name']} ({r['category']}) [{r['crew_tag']}] @ {r['location']}" for r in matches}
+            item_id = st.selectbox("Select an item to edit", options=list(labels), format_func=labels.get)
+            if len(matches) == EDIT_SEARCH_LIMIT:
+                st.caption(f"Showing the first {EDIT_SEARCH_LIMIT} matches; type more to narrow it down.")
+            item = next(r for r in matches if r["id"] == item_id)
+            st.query_params["item"] = str(item_id)
+
+        if item is not None:
+            current_img = get_item_image(item_id, width=EDIT_IMAGE_WIDTH)
             with st.form("edit_item_form"):
                 new_name = st.text_input("Item name", value=item["name"])
-                new_category = st.selectbox("Category", options=PRESET_CATEGORIES, index=PRESET_CATEGORIES.index(item["category"]) if item["category"] in PRESET_CATEGORIES else 0)
-                new_crew_tag = st.selectbox("Crew tag", options=PRESET_TAGS, index=PRESET_TAGS.index(item["crew_tag"]) if item["crew_tag"] in PRESET_TAGS else 0)
+                cats = current_categories()
+                tags = current_tags()
+                new_category = st.selectbox("Category", options=cats, index=cats.index(item["category"]) if item["category"] in cats else 0)
+                new_crew_tag = st.selectbox("Crew tag", options=tags, index=tags.index(item["crew_tag"]) if item["crew_tag"] in tags else 0)
                 locs = current_locations()
                 new_location = st.selectbox("Location", options=locs, index=locs.index(item["location"]) if item["location"] in locs else 0)
                 new_in_use = st.checkbox("Currently in use?", value=item["in_use"]) 
                 st.markdown("---")
                 st.caption("Item image")
                 if current_img:
-                    st.image(current_img, caption="Current image", width=220)
+                    st.image(current_img, caption="Current image", width=EDIT_IMAGE_WIDTH)
                 remove_img = st.checkbox("Remove image", value=False)
                 replace_img = st.file_uploader("Replace with new image (optional)", type=["png", "jpg", "jpeg", "webp"])
                 submitted = st.form_submit_button("Save Changes")
@@ -287,11 +634,40 @@ elif page == "Edit Item":  # SC2 (admin only)
                             # Remove image (if any) then the item
                             remove_item_image(item_id)
                             delete_item(item_id)
+                            del st.query_params["item"]
                             st.success("Item deleted.")
                             st.rerun()
                         else:
                             st.warning("Please confirm deletion by checking the box.")
 
+elif page == "Bulk Import":  # admin only
+    if not is_admin():
+        st.warning("Not authorized.")
+    else:
+        st.header("Bulk Import")
+        st.caption(
+            "Upload a CSV with a header row, or a JSONL file with one object per line. "
+            "Columns: name, crew_tag, location (required), category, in_use (yes/no)."
+        )
+        from inventory_import import import_items, detect_format
+        upload = st.file_uploader("Inventory file", type=["csv", "jsonl", "ndjson"])
+        create_locs = st.checkbox("Create locations that don't exist yet", value=True)
+        if upload is not None and st.button("Import", type="primary"):
+            with st.spinner("Importing..."):
+                report = import_items(upload, detect_format(upload.name), create_locations=create_locs)
+            st.success(f"Imported {report['inserted']} item(s).")
+            if report["stopped"]:
+                st.error(f"Import {report['stopped']}. Items up to that point were kept.")
+            if report["locations_created"]:
+                st.info("New locations: " + ", ".join(report["locations_created"]))
+            if report["failed"]:
+                st.warning(f"{report['failed']} row(s) were skipped.")
+                st.dataframe(
+                    [{"Line": line_no, "Error": message} for line_no, message in report["errors"]],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
 elif page == "Location Report":  # SC5
     st.header("Location Report")
     st.caption("List items in a location; mark items temporarily in use.")
@@ -299,7 +675,67 @@ elif page == "Location Report":  # SC5
     location = st.selectbox("Choose a location", options=current_locations())
     show_in_use = st.checkbox("Show only items currently in use", value=False)
 
-    rows = list_items(locations=[location], in_use=True if show_in_use else None)
+    # Keep the last result and apply only the items changed since its version
+    report_sig = repr((location, show_in_use))
+    cached_report = st.session_state.get("report_cache")
+    prev_rows, prev_version = cached_report[1:] if cached_report and cached_report[0] == report_sig else (None, None)
+    rows, version = refresh_items(
+        prev_rows, prev_version, locations=[location], in_use=True if show_in_use else None, with_images=True
+    )
+    st.session_state["report_cache"] = (report_sig, rows, version)
+
+    with st.expander("Batch check-in / check-out"):
+        # Bumped after each batch so the selection and scan box start empty again
+        nonce = st.session_state.setdefault("batch_nonce", 0)
+        labels = {r["id"]: f"#{r['id']} — {r['name']}" for r in rows}
+        selected = st.multiselect(
+            "Select items", options=list(labels), format_func=labels.get, key=f"batch_select_{nonce}"
+        )
+        b1, b2, b3 = st.columns(3)
+        batch = None
+        if b1.button("Check out selected", disabled=not selected):
+            batch = (selected, True)
+        if b2.button("Check in selected", disabled=not selected):
+            batch = (selected, False)
+        in_use_here = [r["id"] for r in rows if r["in_use"]]
+        if b3.button(f"Check in all in this location ({len(in_use_here)})", disabled=not in_use_here):
+            batch = (in_use_here, False)
+
+        st.divider()
+        scanned = st.text_area("Scan or paste item IDs", key=f"batch_scan_{nonce}",
+                               placeholder="One ID per scan, or separated by spaces/commas")
+        s1, s2 = st.columns(2)
+        scan_action = None
+        if s1.button("Check out scanned", disabled=not scanned.strip()):
+            scan_action = True
+        if s2.button("Check in scanned", disabled=not scanned.strip()):
+            scan_action = False
+        unknown = []
+        if scan_action is not None:
+            scan_ids, unknown = parse_item_ids(scanned)
+            found = {r["id"] for r in list_items(ids=scan_ids)} if scan_ids else set()
+            unknown += [str(i) for i in dict.fromkeys(scan_ids) if i not in found]
+            batch = (sorted(found), scan_action)
+
+        if batch is not None:
+            ids, checking_out = batch
+            changed = set_in_use_many(ids, checking_out)
+            # Shown after the rerun below
+            st.session_state["batch_result"] = (
+                f"{'Checked out' if checking_out else 'Checked in'} {changed} item(s)"
+                f" ({len(set(ids)) - changed} already {'out' if checking_out else 'in'}).",
+                unknown,
+            )
+            st.session_state["batch_nonce"] = nonce + 1
+            # Per-row toggles keep their own state; drop it so they show the new values
+            for item_id in ids:
+                st.session_state.pop(f"toggle_{item_id}", None)
+            st.rerun()
+        if "batch_result" in st.session_state:
+            message, unknown = st.session_state.pop("batch_result")
+            st.success(message)
+            if unknown:
+                st.warning(f"Not found, skipped: {', '.join(unknown)}")
 
     if rows:
         for r in rows:
@@ -310,7 +746,7 @@ elif page == "Location Report":  # SC5
                 set_in_use(r["id"], toggled)
                 st.rerun()
 
-            if has_item_image(r["id"]):
+            if r["has_image"]:
                 flag_key = f"show_img_report_{r['id']}"
                 shown = st.session_state.get(flag_key, False)
                 label = "Hide Image" if shown else "View Image"
@@ -319,16 +755,82 @@ elif page == "Location Report":  # SC5
                     st.rerun()
 
                 if st.session_state.get(flag_key):
-                    img_path = get_item_image(r["id"])
+                    img_path = get_item_image(r["id"], width=FULL_IMAGE_WIDTH)
                     if img_path:
                         st.image(img_path, use_container_width=True, caption=f"#{r['id']} — {r['name']}")
 
-        df = pd.DataFrame(rows)
-        csv = df.to_csv(index=False)
-        st.download_button("Download CSV", data=csv, file_name=f"location_report_{location.replace(' ', '_')}.csv", mime="text/csv")
+        render_export_controls(
+            "location_export",
+            {"locations": [location], "in_use": True if show_in_use else None},
+            f"location_report_{location.replace(' ', '_')}",
+        )
     else:
         st.info("No items found for this selection.")
 
+elif page == "Dashboard":
+    st.header("Dashboard")
+    st.caption("Item and in-use counts per location, category and crew tag.")
+
+    summary = get_inventory_summary()
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Items", summary["items"])
+    m2.metric("In use", summary["in_use"])
+    m3.metric("Available", summary["items"] - summary["in_use"])
+
+    for facet, title in (("location", "By location"), ("category", "By category"), ("crew_tag", "By crew tag")):
+        st.subheader(title)
+        rollup = summary[facet]
+        if not rollup:
+            st.caption("No items yet.")
+            continue
+        st.bar_chart(rollup, x="value", y=["items", "in_use"], stack=False)
+        st.dataframe(
+            rollup,
+            hide_index=True,
+            use_container_width=True,
+            column_config={"value": title.replace("By ", "").capitalize(), "items": "Items", "in_use": "In use"},
+        )
+
+elif page == "Utilization":  # admin only
+    if not is_admin():
+        st.warning("Not authorized.")
+    else:
+        st.header("Utilization")
+        st.caption("Check-outs and time out from the check-out history; hours and days are in UTC.")
+
+        period_label = st.selectbox("Period", options=list(USAGE_PERIODS), index=2)
+        period_s = USAGE_PERIODS[period_label]
+
+        series = get_checkout_series(period_s)
+        if series:
+            st.bar_chart(series, x="bucket", y="checkouts")
+        else:
+            st.caption("No check-outs in this period.")
+
+        columns = {"checkouts": "Check-outs", "hours_out": "Hours out", "out_now": "Out now"}
+        tab_items, tab_locations, tab_tags, tab_out = st.tabs(["Items", "Locations", "Crew tags", "Out now"])
+        for tab, group, title in ((tab_items, "item", "Item"), (tab_locations, "location", "Location"),
+                                  (tab_tags, "crew_tag", "Crew tag")):
+            with tab:
+                rows = get_utilization(group, period_s, limit=USAGE_TOP_ITEMS)
+                if group == "item":
+                    st.caption(f"Top {USAGE_TOP_ITEMS} items by time out.")
+                st.dataframe(
+                    rows,
+                    hide_index=True,
+                    use_container_width=True,
+                    column_order=["value", *columns],
+                    column_config={"value": title, **columns},
+                )
+        with tab_out:
+            st.caption("Items currently checked out, longest first.")
+            st.dataframe(
+                get_checked_out(),
+                hide_index=True,
+                use_container_width=True,
+                column_config={"id": "ID", "name": "Item", "location": "Location", "since": "Out since", "hours_out": "Hours out"},
+            )
+
 # Footer: bottom-left credit
 st.markdown(
     """
@@ -346,3 +848,5 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
+
+note_first_render()
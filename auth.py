@@ -1,6 +1,48 @@
-import os
+import base64
+import hashlib
+import hmac
 import json
+import os
+import secrets
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
 import streamlit as st
+import streamlit.components.v1 as components
+
+from inventory_db import connection
+
+# Stored passwords: "pbkdf2_sha256$<iterations>$<salt b64>$<hash b64>".
+# Entries with a plain "password" field (hand-edited files) still work; run
+# ``python auth.py USERNAME [ROLE]`` to replace them with a hash.
+PBKDF2_ITERATIONS = 200_000
+SALT_BYTES = 16
+
+# Signed sessions kept in a browser cookie survive reconnects and redeploys; they
+# never go into the URL, so shared links carry no sign-in. Logging out bumps the
+# user's epoch in the session_epochs table, which revokes every token issued to
+# them before.
+SESSION_COOKIE = "stage_session"
+# Where older versions kept the token; removed from the URL on sight
+SESSION_PARAM = "session"
+SESSION_TTL_S = 7 * 24 * 3600
+# Tokens older than this are re-issued on the next run, so active users never expire
+SESSION_REFRESH_S = 24 * 3600
+
+# Secret used to sign session tokens: STAGE_AUTH_SECRET, then st.secrets["auth_secret"],
+# then this file (created on first use; kept out of git).
+SECRET_PATH = os.path.join(os.path.dirname(__file__), ".auth_secret")
+
+# username -> {"username", "role", "password_hash" | "password"}, reloaded when the file changes
+_users: Dict[str, Dict[str, str]] = {}
+_users_stamp = None
+_users_lock = threading.Lock()
+_secret: Optional[bytes] = None
+_secret_lock = threading.Lock()
+# Checked against unknown usernames so they take as long as wrong passwords (made on first use)
+_dummy_hash: Optional[str] = None
 
 def _credentials_path():
     return os.path.join(os.path.dirname(__file__), "credentials.json")
@@ -12,18 +54,194 @@ def load_credentials():
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def _user_index() -> Dict[str, Dict[str, str]]:
+    """Users by name; the file is only re-read when its mtime or size changes."""
+    global _users, _users_stamp
+    try:
+        info = os.stat(_credentials_path())
+        stamp = (info.st_mtime_ns, info.st_size)
+    except FileNotFoundError:
+        stamp = None
+    if stamp != _users_stamp:
+        with _users_lock:
+            if stamp != _users_stamp:
+                users = load_credentials().get("users", []) if stamp else []
+                _users = {u["username"]: u for u in users if u.get("username")}
+                _users_stamp = stamp
+    return _users
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def hash_password(password: str, iterations: int = PBKDF2_ITERATIONS) -> str:
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+
+def verify_password(password: str, stored: str) -> bool:
+    try:
+        scheme, iterations, salt, expected = stored.split("$")
+    except ValueError:
+        return False
+    if scheme != "pbkdf2_sha256":
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _unb64(salt), int(iterations))
+    return hmac.compare_digest(digest, _unb64(expected))
+
 def authenticate(username: str, password: str):
-    creds = load_credentials()
-    for u in creds.get("users", []):
-        if u.get("username") == username and u.get("password") == password:
-            return {"username": u.get("username"), "role": u.get("role", "guest")}
+    global _dummy_hash
+    u = _user_index().get(username)
+    if u is None:
+        if _dummy_hash is None:
+            _dummy_hash = hash_password(secrets.token_hex(8))
+        verify_password(password, _dummy_hash)
+        return None
+    if "password_hash" in u:
+        ok = verify_password(password, u["password_hash"])
+    else:
+        ok = hmac.compare_digest(str(u.get("password", "")).encode("utf-8"), password.encode("utf-8"))
+    if ok:
+        return {"username": u.get("username"), "role": u.get("role", "guest")}
     return None
 
+def _read_secret_file() -> Optional[bytes]:
+    try:
+        with open(SECRET_PATH, "rb") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _session_secret() -> bytes:
+    global _secret
+    if _secret is not None:
+        return _secret
+    # Many sessions reconnect at once after a redeploy; only one may create the file
+    with _secret_lock:
+        if _secret is not None:
+            return _secret
+        secret = os.environ.get("STAGE_AUTH_SECRET")
+        if not secret:
+            try:
+                secret = st.secrets.get("auth_secret")
+            except Exception:
+                # No secrets.toml configured
+                secret = None
+        if secret:
+            _secret = secret.encode("utf-8")
+            return _secret
+        stored = _read_secret_file()
+        if stored is None:
+            # Written under a temporary name and linked into place, so another
+            # process never reads a half-written file; if it got there first, use its key
+            tmp = f"{SECRET_PATH}.{os.getpid()}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(secrets.token_hex(32).encode("ascii"))
+            try:
+                os.link(tmp, SECRET_PATH)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp)
+            stored = _read_secret_file()
+        _secret = stored
+    return _secret
+
+def _password_tag(u: Dict[str, str]) -> str:
+    # Changes whenever the user's password does, which revokes their old tokens.
+    # Keyed with the secret: tokens are readable, and plaintext entries may be short PINs.
+    stored = u.get("password_hash") or u.get("password", "")
+    return hmac.new(_session_secret(), stored.encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+def _session_epoch(username: str) -> int:
+    with connection() as conn:
+        row = conn.execute("SELECT epoch FROM session_epochs WHERE username = ?", (username,)).fetchone()
+    return row[0] if row else 0
+
+def revoke_sessions(username: str) -> None:
+    """Invalidate every session token issued to ``username`` so far."""
+    with connection() as conn:
+        conn.execute(
+            "INSERT INTO session_epochs(username, epoch) VALUES (?, 1)"
+            " ON CONFLICT(username) DO UPDATE SET epoch = epoch + 1",
+            (username,),
+        )
+
+def issue_session_token(username: str, now: Optional[float] = None) -> Optional[str]:
+    u = _user_index().get(username)
+    if u is None:
+        return None
+    issued = int(time.time() if now is None else now)
+    claims = {"u": username, "iat": issued, "pw": _password_tag(u), "ep": _session_epoch(username)}
+    payload = _b64(json.dumps(claims).encode("utf-8"))
+    signature = _b64(hmac.new(_session_secret(), payload.encode("ascii"), hashlib.sha256).digest())
+    return f"{payload}.{signature}"
+
+def verify_session_token(token: str, now: Optional[float] = None):
+    """The user a token was issued to (with its issue time), or None if it is forged, expired or revoked."""
+    try:
+        payload, signature = token.split(".")
+        expected = _b64(hmac.new(_session_secret(), payload.encode("ascii"), hashlib.sha256).digest())
+        if not hmac.compare_digest(signature, expected):
+            return None
+        claims = json.loads(_unb64(payload))
+    except (ValueError, TypeError):
+        return None
+    now = time.time() if now is None else now
+    if not isinstance(claims, dict) or not isinstance(claims.get("iat"), int) or now - claims["iat"] > SESSION_TTL_S:
+        return None
+    # The role always comes from the current credentials, and removed users are refused
+    u = _user_index().get(claims.get("u"))
+    if u is None or claims.get("pw") != _password_tag(u) or claims.get("ep") != _session_epoch(u["username"]):
+        return None
+    return {"username": u["username"], "role": u.get("role", "guest"), "issued": claims["iat"]}
+
+def _set_cookie(token: Optional[str]) -> None:
+    """Store the session token in the browser's cookie (None clears it).
+
+    Cookies can only be written from the browser, so this renders an empty
+    component whose script sets it on the app's page. st.context.cookies
+    sees the new value from the next connection on.
+    """
+    value, max_age = (token, SESSION_TTL_S) if token else ("", 0)
+    cookie = json.dumps(f"{SESSION_COOKIE}={value}; Max-Age={max_age}; Path=/; SameSite=Strict")
+    components.html(
+        f"<script>parent.document.cookie = {cookie}"
+        " + (parent.location.protocol === 'https:' ? '; Secure' : '');</script>",
+        height=0,
+    )
+
+def _start_session(user) -> None:
+    st.session_state["user"] = user["username"]
+    st.session_state["role"] = user.get("role", "guest")
+
 def login() -> bool:
+    if SESSION_PARAM in st.query_params:
+        del st.query_params[SESSION_PARAM]
+
     # Already authenticated
     if st.session_state.get("user"):
+        # Set on the run after sign-in, which st.rerun() cut short
+        token = st.session_state.pop("session_cookie", None)
+        if token:
+            _set_cookie(token)
         return True
 
+    # Returning browser (reconnect, redeploy): restore the session from its cookie
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if token:
+        user = verify_session_token(token)
+        if user:
+            _start_session(user)
+            if time.time() - user["issued"] > SESSION_REFRESH_S:
+                _set_cookie(issue_session_token(user["username"]))
+            return True
+        # Expired or revoked (e.g. by logging out)
+        _set_cookie(None)
+
     st.title("STAGE Inventory — Sign in")
 
     with st.form("login_form"):
@@ -34,16 +252,20 @@ def login() -> bool:
     if submitted:
         user = authenticate(username.strip(), password)
         if user:
-            st.session_state["user"] = user["username"]
-            st.session_state["role"] = user.get("role", "guest")
+            _start_session(user)
+            st.session_state["session_cookie"] = issue_session_token(user["username"])
             st.rerun()
         else:
             st.error("Invalid username or password.")
     return False
 
 def logout():
-    for k in ("user", "role"):
+    user = st.session_state.get("user")
+    if user:
+        revoke_sessions(user)
+    for k in ("user", "role", "session_cookie"):
         st.session_state.pop(k, None)
+    # The browser keeps the now revoked cookie until the next restore attempt clears it.
     # Do not call st.rerun() here; trigger it from normal code after the button press.
 
 def current_user() -> str | None:
@@ -53,4 +275,31 @@ def current_role() -> str:
     return st.session_state.get("role", "guest")
 
 def is_admin() -> bool:
-    return current_role() == "admin"
\ No newline at end of file
+    return current_role() == "admin"
+
+def set_password(username: str, password: str, role: Optional[str] = None) -> None:
+    """Add the user or replace their password (stored hashed) in credentials.json."""
+    creds = load_credentials()
+    users = creds.setdefault("users", [])
+    entry = next((u for u in users if u.get("username") == username), None)
+    if entry is None:
+        entry = {"username": username, "role": role or "guest"}
+        users.append(entry)
+    elif role:
+        entry["role"] = role
+    entry.pop("password", None)
+    entry["password_hash"] = hash_password(password)
+    path = _credentials_path()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(creds, f, indent=2)
+    os.replace(tmp, path)
+
+if __name__ == "__main__":
+    import getpass
+
+    if len(sys.argv) not in (2, 3):
+        print("usage: python auth.py USERNAME [ROLE]", file=sys.stderr)
+        sys.exit(2)
+    set_password(sys.argv[1], getpass.getpass("Password: "), sys.argv[2] if len(sys.argv) == 3 else None)
+    print(f"Saved the password for {sys.argv[1]}.")
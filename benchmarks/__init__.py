@@ -0,0 +1,6 @@
+"""Synthetic-data benchmarks for the inventory, image and announcement stores.
+
+Run from the repository root::
+
+    python -m benchmarks.run --sizes 1000 100000 --output bench_results.json
+"""
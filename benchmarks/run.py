@@ -0,0 +1,290 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import announcements
+import inventory_db
+import item_images
+from benchmarks.synthetic import generate_announcements, generate_items, make_locations
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+PAGE_SIZE = 50
+LOCATIONS = 12
+IMAGE_SHARE = 0.2
+ANNOUNCEMENT_HISTORY = 20_000
+BURST_TOGGLES = 400
+BURST_THREADS = 8
+
+# Representative value for every list_items filter; each benchmark enables a subset.
+FILTER_VALUES = {
+    "name_query": "lantern",
+    "categories": ["Props", "Costumes"],
+    "tags": ["Props"],
+    "locations": ["West Campus Basement Storage"],
+    "in_use": True,
+}
+
+
+def use_workdir(workdir: str) -> None:
+    """Point every store at a scratch directory so the real data is never touched."""
+    inventory_db.DB_PATH = os.path.join(workdir, "bench.db")
+    inventory_db.LEGACY_IMAGE_MAP_PATH = os.path.join(workdir, "item_images.json")
+    item_images.IMAGES_DIR = os.path.join(workdir, "item_images")
+    item_images.BLOBS_DIR = os.path.join(item_images.IMAGES_DIR, "blobs")
+    item_images.CACHE_DIR = os.path.join(item_images.IMAGES_DIR, "cache")
+    inventory_db.LEGACY_ANNOUNCEMENTS_PATH = os.path.join(workdir, "announcements.json")
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    stats = {
+        "runs": repeat,
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+    if isinstance(result, (list, tuple, dict)):
+        rows = result[0] if isinstance(result, tuple) else result
+        stats["rows"] = len(rows)
+    return stats
+
+
+def seed_inventory(size: int, seed: int) -> None:
+    inventory_db.init_db()
+    batch: List[Dict[str, Any]] = []
+    for item in generate_items(size, seed=seed, locations=LOCATIONS):
+        batch.append(item)
+        if len(batch) >= 10_000:
+            inventory_db.add_items_bulk(batch)
+            batch = []
+    if batch:
+        inventory_db.add_items_bulk(batch)
+    for name, _ in make_locations(LOCATIONS):
+        inventory_db.add_location(name)
+
+    # Image rows only: the lookups being measured never read the files.
+    rng = random.Random(seed)
+    with inventory_db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO item_images(item_id, path) VALUES (?, ?)",
+            ((i, f"bench_{i}.png") for i in range(1, size + 1) if rng.random() < IMAGE_SHARE),
+        )
+
+
+def seed_announcements(count: int, seed: int) -> None:
+    with inventory_db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO announcements(id, text, author, ts) VALUES (:id, :text, :author, :ts)",
+            generate_announcements(count, seed=seed),
+        )
+
+
+def bench_list_items(size: int, repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    names = list(FILTER_VALUES)
+    for enabled in itertools.product([False, True], repeat=len(names)):
+        filters = {n: FILTER_VALUES[n] for n, on in zip(names, enabled) if on}
+        label = "+".join(sorted(filters)) or "none"
+        runs = 1 if not filters and size >= 1_000_000 else repeat
+        results.append({"name": f"list_items[{label}]", **measure(lambda: inventory_db.list_items(**filters), runs)})
+        results.append({
+            "name": f"list_items_page[{label}]",
+            **measure(lambda: inventory_db.list_items_page(**filters, page_size=PAGE_SIZE, with_images=True), repeat),
+        })
+    return results
+
+
+def bench_search(repeat: int) -> List[Dict[str, Any]]:
+    # Build the trigram index up front (the app does it in the background); time that separately
+    build = {"name": "sync_trigrams[index build]", **measure(inventory_db.sync_trigrams, 1)}
+    return [build] + [
+        {"name": f"search_items[{query!r}]", **measure(lambda: inventory_db.search_items(query), repeat)}
+        for query in ("42", "a", "antique", "lan")
+    ] + [
+        {"name": f"fuzzy_search[{query!r}]", **measure(lambda: inventory_db.fuzzy_search(query), repeat)}
+        for query in ("antiqe lantrn", "masonjar")
+    ]
+
+
+def bench_catalogs(repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for name, fn in (("get_tags", inventory_db.get_tags), ("get_categories", inventory_db.get_categories),
+                     ("get_locations", inventory_db.get_locations)):
+        def cold():
+            inventory_db._catalog_cache.clear()
+            return fn()
+        results.append({"name": f"{name}[cold]", **measure(cold, repeat)})
+        results.append({"name": f"{name}[warm]", **measure(fn, repeat)})
+    results.append({"name": "get_inventory_summary", **measure(inventory_db.get_inventory_summary, repeat)})
+    return results
+
+
+def bench_set_in_use(size: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    ids = [rng.randint(1, size) for _ in range(BURST_TOGGLES)]
+
+    def sequential():
+        for i, item_id in enumerate(ids):
+            inventory_db.set_in_use(item_id, i % 2 == 0)
+
+    def concurrent():
+        chunks = [ids[i::BURST_THREADS] for i in range(BURST_THREADS)]
+        threads = [
+            threading.Thread(target=lambda c=c: [inventory_db.set_in_use(i, True) for i in c])
+            for c in chunks
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    return [
+        {"name": f"set_in_use[burst x{BURST_TOGGLES}]", **measure(sequential, 1)},
+        {"name": f"set_in_use[{BURST_THREADS} threads x{BURST_TOGGLES // BURST_THREADS}]", **measure(concurrent, 1)},
+    ]
+
+
+def bench_usage(repeat: int) -> List[Dict[str, Any]]:
+    # Fold every logged check-out into the rollups first (the app does it in the background)
+    results = [{"name": "sync_usage[rollup sync]", **measure(inventory_db.sync_usage, 1)}]
+    for group in inventory_db.USAGE_GROUPS:
+        for days in (1, 30, 365):
+            results.append({
+                "name": f"get_utilization[{group}, {days}d]",
+                **measure(lambda: inventory_db.get_utilization(group, days * inventory_db.USAGE_DAY), repeat),
+            })
+    return results
+
+
+def bench_images(repeat: int) -> List[Dict[str, Any]]:
+    page, _ = inventory_db.list_items_page(page_size=PAGE_SIZE)
+    ids = [r["id"] for r in page]
+    return [
+        {"name": f"has_item_image[page of {len(ids)}]", **measure(lambda: [item_images.has_item_image(i) for i in ids], repeat)},
+        {"name": f"get_item_images[page of {len(ids)}]", **measure(lambda: item_images.get_item_images(ids), repeat)},
+    ]
+
+
+def bench_announcements(repeat: int) -> List[Dict[str, Any]]:
+    def tenth_page():
+        before = None
+        for _ in range(10):
+            posts, before = announcements.load_announcements_page(before, page_size=20)
+        return posts
+
+    return [
+        {"name": f"load_announcements[latest 5 of {ANNOUNCEMENT_HISTORY}]",
+         **measure(lambda: announcements.load_announcements(limit=5), repeat)},
+        {"name": f"load_announcements_page[pages 1-10 of {ANNOUNCEMENT_HISTORY}]", **measure(tenth_page, repeat)},
+    ]
+
+
+def run_size(size: int, seed: int, repeat: int, workdir: str) -> List[Dict[str, Any]]:
+    sub = os.path.join(workdir, str(size))
+    os.makedirs(sub)
+    use_workdir(sub)
+    start = time.perf_counter()
+    seed_inventory(size, seed)
+    seed_announcements(ANNOUNCEMENT_HISTORY, seed)
+    results = [{"name": "seed_inventory", "runs": 1, "min_ms": round((time.perf_counter() - start) * 1000, 3)}]
+    results += bench_list_items(size, repeat)
+    results += bench_search(repeat)
+    results += bench_catalogs(repeat)
+    results += bench_images(repeat)
+    results += bench_announcements(repeat)
+    results += bench_set_in_use(size, seed)
+    results += bench_usage(repeat)
+    inventory_db.close_connections()
+    for r in results:
+        r["size"] = size
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline_path: str, threshold: float) -> int:
+    """Print median-time ratios against an earlier results file; returns the regression count."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["size"], r["name"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for r in current["results"]:
+        old = baseline.get((r["size"], r["name"]))
+        if not old or "median_ms" not in r or not old.get("median_ms"):
+            continue
+        ratio = r["median_ms"] / old["median_ms"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- slower"
+            regressions += 1
+        print(f"{r['size']:>9} {r['name']:<70} {old['median_ms']:>10.3f} -> {r['median_ms']:>10.3f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark inventory_db, item_images and announcements on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="inventory sizes to generate")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="results file from an earlier commit")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="stage_bench_")
+    try:
+        results = []
+        for size in args.sizes:
+            print(f"Benchmarking {size} items...", file=sys.stderr)
+            results += run_size(size, args.seed, args.repeat, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        return 1 if compare(report, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
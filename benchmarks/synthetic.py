@@ -0,0 +1,75 @@
+import random
+from typing import Any, Dict, Iterator, List
+
+# Weighted the way a school theatre's stock tends to be: lots of props and
+# costumes, a long tail of everything else.
+CATEGORIES = [
+    ("Props", 30), ("Costumes", 25), ("Set Pieces", 12), ("Lighting", 10),
+    ("Sound", 8), ("Equipment", 10), ("General", 5),
+]
+# Crew tag most likely to own each category
+CATEGORY_TAGS = {
+    "Props": "Props", "Costumes": "Costumes", "Set Pieces": "Set", "Lighting": "Lights",
+    "Sound": "Sound", "Equipment": "General Tech", "General": "Theatre Class Usage",
+}
+TAGS = ["Lights", "Sound", "Set", "Props", "Costumes", "General Tech", "Theatre Class Usage"]
+MAIN_LOCATIONS = [
+    "West Campus Basement Storage",
+    "East Campus Basement Storage",
+    "East Campus Theatre Closet",
+]
+
+NOUNS = {
+    "Props": ["mason jar", "teacup", "lantern", "suitcase", "umbrella", "book", "telephone", "candlestick", "bottle", "clock"],
+    "Costumes": ["top hat", "waistcoat", "petticoat", "cape", "bonnet", "tailcoat", "apron", "gown", "boots", "wig"],
+    "Set Pieces": ["sawhorse", "flat", "platform", "staircase unit", "door frame", "bench", "table", "chair", "arch", "window unit"],
+    "Lighting": ["led par can", "ellipsoidal", "fresnel", "gel frame", "followspot", "dmx cable", "dimmer pack", "gobo", "barn door", "cyc light"],
+    "Sound": ["xlr cable", "sm58 mic", "lav mic", "di box", "monitor wedge", "snake", "mixer", "speaker stand", "headset", "wireless pack"],
+    "Equipment": ["ladder", "extension cord", "drill", "clamp", "gaffer tape", "tool kit", "dolly", "sandbag", "tie line", "c-wrench"],
+    "General": ["bin", "crate", "tarp", "bucket", "broom", "shelf", "hanger", "sign", "cart", "box"],
+}
+ADJECTIVES = ["red", "blue", "black", "antique", "small", "large", "broken", "vintage", "white", "wooden", "metal", "spare"]
+
+
+def _weighted(rng: random.Random, pairs: List[tuple]) -> str:
+    return rng.choices([p[0] for p in pairs], weights=[p[1] for p in pairs])[0]
+
+
+def make_locations(count: int) -> List[tuple]:
+    """The three real storage rooms carry most items; extra rooms share a long tail."""
+    extra = [f"Storage Room {i:02d}" for i in range(max(0, count - len(MAIN_LOCATIONS)))]
+    weights = [40, 30, 15] + [15 / max(1, len(extra))] * len(extra)
+    return list(zip(MAIN_LOCATIONS + extra, weights))
+
+
+def generate_items(count: int, seed: int = 1234, locations: int = 12) -> Iterator[Dict[str, Any]]:
+    """Yield ``count`` reproducible synthetic items (dicts for add_items_bulk)."""
+    rng = random.Random(seed)
+    location_weights = make_locations(locations)
+    for i in range(count):
+        category = _weighted(rng, CATEGORIES)
+        tag = CATEGORY_TAGS[category] if rng.random() < 0.85 else rng.choice(TAGS)
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS[category])}".title()
+        if rng.random() < 0.5:
+            name += f" #{rng.randint(1, 400)}"
+        yield {
+            "name": name,
+            "category": category,
+            "crew_tag": tag,
+            "location": _weighted(rng, location_weights),
+            "in_use": rng.random() < 0.1,
+        }
+
+
+def generate_announcements(count: int, seed: int = 1234) -> Iterator[Dict[str, Any]]:
+    """Yield ``count`` announcements spread over a season, oldest first."""
+    rng = random.Random(seed)
+    authors = ["Joe", "Admin", "Stage Manager", "TD"]
+    for i in range(count):
+        day = i * 180 // max(1, count)
+        yield {
+            "id": f"bench{i:07d}",
+            "text": f"Update {i}: {rng.choice(['strike', 'load-in', 'rehearsal', 'fitting'])} at {rng.randint(1, 12)}pm",
+            "author": rng.choice(authors),
+            "ts": f"2025-{1 + day // 30:02d}-{1 + day % 28:02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00+00:00",
+        }
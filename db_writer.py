@@ -0,0 +1,168 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+import perf
+
+# Most operations committed in one transaction. The writer never waits to
+# fill a batch: it takes whatever queued up while the previous one committed.
+MAX_BATCH = 128
+# Attempts (with exponential backoff) when another process holds the write lock
+BUSY_RETRIES = 6
+BUSY_BACKOFF_S = 0.02
+
+Operation = Callable[[sqlite3.Connection], Any]
+# (operation, caller's future, whether it must be committed alone, caller's perf session)
+_Entry = Tuple[Operation, Future, bool, Optional[str]]
+
+
+def _is_busy(exc: sqlite3.OperationalError) -> bool:
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+class WriteQueue:
+    """Funnel database writes through one thread that commits them in small batches.
+
+    Callers block in submit() until their operation is committed (or failed),
+    so the behaviour seen by callers is the same as writing directly. In a
+    batch of several operations each runs in its own savepoint: one failing
+    operation is rolled back and re-raised to its caller without affecting
+    the rest. Operations submitted with ``alone=True`` (bulk writes) always
+    get a transaction to themselves, because SQLite slows down sharply when
+    many trigger-firing statements run inside an open savepoint.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], name: str = "db-writer"):
+        self._connect = connect
+        self._name = name
+        # Each writer thread gets its own queue; None is the stop request queued by close()
+        self._queue: "Optional[queue.Queue[Optional[_Entry]]]" = None
+        self._thread = None
+        # The writer thread's connection, for operations that submit() from inside the writer
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def submit(self, op: Operation, alone: bool = False) -> Any:
+        """Run ``op(conn)`` on the writer thread; returns its result or raises its exception."""
+        if threading.current_thread() is self._thread:
+            # Called from inside another queued operation: already in its transaction.
+            return op(self._local.conn)
+        future: Future = Future()
+        # Starting the thread and queueing happen together, so an entry is never
+        # left in the queue of a writer that has already exited.
+        with self._lock:
+            if self._thread is None:
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name=self._name, daemon=True)
+                self._thread.start()
+            self._queue.put((op, future, alone, perf.session()))
+        return future.result()
+
+    def close(self) -> None:
+        """Stop the writer thread once the operations queued so far are committed."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _next_batch(self, jobs: "queue.Queue[Optional[_Entry]]", held: List[Optional[_Entry]]) -> List[_Entry]:
+        """Collect queued operations for one transaction; an empty list means stop.
+
+        ``held`` carries an entry (or stop request) already taken off the queue
+        that belongs to the next batch.
+        """
+        first = held.pop() if held else jobs.get()
+        if first is None:
+            return []
+        batch = [first]
+        while not first[2] and len(batch) < MAX_BATCH:
+            try:
+                entry = jobs.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None or entry[2]:
+                held.append(entry)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self, jobs: "queue.Queue[Optional[_Entry]]") -> None:
+        held: List[Optional[_Entry]] = []
+        batch: List[_Entry] = []
+        conn = None
+        try:
+            conn = self._local.conn = self._connect()
+            # Transactions are managed explicitly below
+            conn.isolation_level = None
+            while True:
+                batch = self._next_batch(jobs, held)
+                if not batch:
+                    break
+                try:
+                    outcomes = self._commit_batch(conn, batch)
+                except BaseException as exc:
+                    outcomes = [(False, exc)] * len(batch)
+                for (_, future, _, _), (ok, value) in zip(batch, outcomes):
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+                batch = []
+        except BaseException as exc:
+            # The writer cannot go on (e.g. the database could not be opened):
+            # fail everything waiting on it; the next submit() starts a new writer.
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+            pending = batch + [e for e in held if e is not None]
+            while True:
+                try:
+                    entry = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is not None:
+                    pending.append(entry)
+            for _, future, _, _ in pending:
+                if not future.done():
+                    future.set_exception(exc)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: List[_Entry]) -> List[Tuple[bool, Any]]:
+        savepoints = len(batch) > 1
+        for attempt in range(BUSY_RETRIES):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                outcomes = []
+                for op, _, _, session in batch:
+                    if savepoints:
+                        conn.execute("SAVEPOINT op")
+                    try:
+                        with perf.attributed_to(session):
+                            outcomes.append((True, op(conn)))
+                    except Exception as exc:
+                        if isinstance(exc, sqlite3.OperationalError) and _is_busy(exc):
+                            raise
+                        if not savepoints:
+                            conn.execute("ROLLBACK")
+                            return [(False, exc)]
+                        conn.execute("ROLLBACK TO op")
+                        outcomes.append((False, exc))
+                    if savepoints:
+                        conn.execute("RELEASE op")
+                conn.execute("COMMIT")
+                return outcomes
+            except sqlite3.OperationalError as exc:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if not _is_busy(exc) or attempt == BUSY_RETRIES - 1:
+                    raise
+                time.sleep(BUSY_BACKOFF_S * (2 ** attempt))
+        raise AssertionError("unreachable")
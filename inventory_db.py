@@ -1,177 +1,1998 @@
+import base64
+import json
+import logging
 import os
+import queue
+import re
 import sqlite3
-from typing import List, Optional, Dict, Any
+import string
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any, Iterator, Iterable, Set, Callable, Tuple
+
+import perf
+from db_writer import WriteQueue
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "stage_inventory.db")
+# Item -> image mapping used before it moved into the item_images table (migration 5)
+LEGACY_IMAGE_MAP_PATH = os.path.join(os.path.dirname(__file__), "item_images.json")
+# Announcement board file used before announcements moved into the database (migration 8)
+LEGACY_ANNOUNCEMENTS_PATH = os.path.join(os.path.dirname(__file__), "announcements.json")
+
+# Connection pool settings. Streamlit runs every session (and every rerun) on
+# its own thread, so connections are shared through a small pool instead of
+# being tied to a thread.
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KB = 16 * 1024
+
+_pools: Dict[str, "queue.LifoQueue[sqlite3.Connection]"] = {}
+_pools_lock = threading.Lock()
+
+# Item mutations are serialized through one writer thread per database,
+# which commits whatever is queued together (see db_writer).
+_writers: Dict[str, WriteQueue] = {}
+
+# Item change-feed entries kept before the oldest are pruned (migration 9)
+CHANGELOG_RETENTION = 50000
+
+# Databases whose schema has been brought up to date by this process.
+_initialized: Set[str] = set()
+_init_lock = threading.Lock()
+
+# get_locations / get_tags / get_categories results shared by all sessions:
+# (DB_PATH, catalog) -> (catalog_version, values)
+_catalog_cache: Dict[Tuple[str, str], Tuple[int, List[str]]] = {}
+
+# Whether the items_fts index exists, per database path (None = not checked yet).
+_fts_available: Dict[str, bool] = {}
+
+# Background trigram index builders (start_trigram_sync), per database path.
+_trigram_jobs: Dict[str, threading.Thread] = {}
+# Background usage folders (start_usage_sync), per database path.
+_usage_jobs: Dict[str, threading.Thread] = {}
 
 
 def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+    """Open a new, fully configured connection. Prefer ``connection()``, which reuses pooled ones."""
+    conn = sqlite3.connect(
+        DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False, factory=perf.TracedConnection
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
     return conn
 
 
+def _pool() -> "queue.LifoQueue[sqlite3.Connection]":
+    # Keyed by path so DB_PATH can be pointed elsewhere (e.g. a scratch database).
+    with _pools_lock:
+        pool = _pools.get(DB_PATH)
+        if pool is None:
+            pool = _pools[DB_PATH] = queue.LifoQueue(maxsize=POOL_SIZE)
+        return pool
+
+
+@contextmanager
+def connection() -> Iterator[sqlite3.Connection]:
+    """Borrow a pooled connection; commits on success, rolls back on error."""
+    pool = _pool()
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = get_connection()
+    try:
+        with conn:
+            yield conn
+    finally:
+        _release(pool, conn)
+
+
+def _release(pool: "queue.LifoQueue[sqlite3.Connection]", conn: sqlite3.Connection) -> None:
+    # A connection left mid-transaction is discarded rather than reused.
+    if conn.in_transaction:
+        conn.close()
+        return
+    try:
+        pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+def _writer() -> WriteQueue:
+    with _pools_lock:
+        writer = _writers.get(DB_PATH)
+        if writer is None:
+            writer = _writers[DB_PATH] = WriteQueue(get_connection)
+        return writer
+
+
+def close_connections() -> None:
+    """Close every idle pooled connection and writer thread (e.g. before replacing the database file)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
 def init_db() -> None:
-    """Create the items table if it doesn't exist and run lightweight migrations."""
-    with get_connection() as conn:
-        # Items table
+    """Bring the schema up to date by running any pending numbered migrations.
+
+    The schema version lives in ``PRAGMA user_version``; once a database is
+    current this is a single pragma read, and it is skipped entirely for the
+    rest of the process after the first call.
+    """
+    if DB_PATH in _initialized:
+        return
+    with _init_lock:
+        if DB_PATH in _initialized:
+            return
+        with connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < len(MIGRATIONS):
+                _run_migrations(conn)
+        _initialized.add(DB_PATH)
+
+
+def _run_migrations(conn: sqlite3.Connection) -> None:
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        # Each migration commits together with its version bump. The version is
+        # re-read under the write lock in case another process got there first.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= number:
+                conn.rollback()
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def _migration_1_base_schema(conn: sqlite3.Connection) -> None:
+    """Items and locations tables, the updated_at trigger and default locations.
+
+    Written with IF NOT EXISTS so it also adopts databases created before
+    migrations were versioned.
+    """
+    # Items table
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT 'General',
+            crew_tag TEXT NOT NULL,
+            location TEXT NOT NULL,
+            in_use INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    # Locations table
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS locations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        );
+        """
+    )
+    # Databases created before categories existed lack the column
+    info = conn.execute("PRAGMA table_info(items)").fetchall()
+    cols = {row[1] for row in info}  # second field is name
+    if "category" not in cols:
+        conn.execute("ALTER TABLE items ADD COLUMN category TEXT NOT NULL DEFAULT 'General'")
+
+    # Simple trigger to keep updated_at fresh
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_items_updated
+        AFTER UPDATE ON items
+        FOR EACH ROW
+        BEGIN
+            UPDATE items SET updated_at = CURRENT_TIMESTAMP WHERE id = OLD.id;
+        END;
+        """
+    )
+
+    # Seed default locations if table is empty
+    cur = conn.execute("SELECT COUNT(*) FROM locations")
+    if cur.fetchone()[0] == 0:
+        defaults = [
+            ("West Campus Basement Storage",),
+            ("East Campus Basement Storage",),
+            ("East Campus Theatre Closet",),
+        ]
+        conn.executemany("INSERT OR IGNORE INTO locations(name) VALUES (?)", defaults)
+
+
+def _migration_2_name_search(conn: sqlite3.Connection) -> None:
+    """FTS5 index over item names, kept in sync by triggers and backfilled once."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'"
+    ).fetchone()
+    if not exists:
+        try:
+            conn.execute(
+                """
+                CREATE VIRTUAL TABLE items_fts USING fts5(
+                    name,
+                    content='items',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                );
+                """
+            )
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: list_items falls back to LIKE.
+            _fts_available[DB_PATH] = False
+            return
+        conn.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_items_fts_insert
+        AFTER INSERT ON items
+        BEGIN
+            INSERT INTO items_fts(rowid, name) VALUES (NEW.id, NEW.name);
+        END;
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_items_fts_delete
+        AFTER DELETE ON items
+        BEGIN
+            INSERT INTO items_fts(items_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+        END;
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_items_fts_update
+        AFTER UPDATE OF name ON items
+        BEGIN
+            INSERT INTO items_fts(items_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+            INSERT INTO items_fts(rowid, name) VALUES (NEW.id, NEW.name);
+        END;
+        """
+    )
+    _fts_available[DB_PATH] = True
+
+
+def _migration_3_filter_indexes(conn: sqlite3.Connection) -> None:
+    """Indexes matching the Browse & Filter and Location Report query shapes."""
+    # Default ordering of every listing
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_name ON items(name COLLATE NOCASE)")
+    # Category / crew tag filters (and DISTINCT scans in get_categories / get_tags)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_category ON items(category, name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_crew_tag ON items(crew_tag, name COLLATE NOCASE)")
+    # Location Report: one location, optionally only in-use items, ordered by name
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_location ON items(location, in_use, name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_in_use ON items(in_use, name COLLATE NOCASE)")
+    conn.execute("ANALYZE")
+
+
+def _migration_4_sort_indexes(conn: sqlite3.Connection) -> None:
+    """Index for paging a location's items by name (the other sort keys reuse migration 3)."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_location_name ON items(location, name COLLATE NOCASE)")
+
+
+def _migration_5_item_images(conn: sqlite3.Connection) -> None:
+    """Item -> image table, imported from the legacy item_images.json map."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS item_images (
+            item_id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL
+        );
+        """
+    )
+    if os.path.exists(LEGACY_IMAGE_MAP_PATH):
+        with open(LEGACY_IMAGE_MAP_PATH, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+        conn.executemany(
+            "INSERT OR REPLACE INTO item_images(item_id, path) VALUES (?, ?)",
+            [(int(k), v) for k, v in mapping.items() if v and os.path.exists(v)],
+        )
+
+
+def _migration_6_image_blobs(conn: sqlite3.Connection) -> None:
+    """Content-addressed image blobs, reference-counted by the item_images rows using them.
+
+    Rows imported before this migration keep ``sha256`` NULL and own their file
+    outright until item_images.adopt_legacy_images() moves them into the store.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS image_blobs (
+            sha256 TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    conn.execute("ALTER TABLE item_images ADD COLUMN sha256 TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_item_images_sha256 ON item_images(sha256)")
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_item_images_ref_insert
+        AFTER INSERT ON item_images
+        WHEN NEW.sha256 IS NOT NULL
+        BEGIN
+            UPDATE image_blobs SET refcount = refcount + 1 WHERE sha256 = NEW.sha256;
+        END;
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_item_images_ref_delete
+        AFTER DELETE ON item_images
+        WHEN OLD.sha256 IS NOT NULL
+        BEGIN
+            UPDATE image_blobs SET refcount = refcount - 1 WHERE sha256 = OLD.sha256;
+        END;
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_item_images_ref_update
+        AFTER UPDATE OF sha256 ON item_images
+        WHEN OLD.sha256 IS NOT NEW.sha256
+        BEGIN
+            UPDATE image_blobs SET refcount = refcount - 1 WHERE sha256 = OLD.sha256;
+            UPDATE image_blobs SET refcount = refcount + 1 WHERE sha256 = NEW.sha256;
+        END;
+        """
+    )
+
+
+def _migration_7_catalog_version(conn: sqlite3.Connection) -> None:
+    """Change counter for the location / tag / category catalogs, bumped by triggers.
+
+    Item triggers only bump it when a value appears for the first time or its
+    last item goes away, so ordinary inventory edits keep the catalog caches warm.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO catalog_version(id, version) VALUES (1, 0)")
+    bump = "UPDATE catalog_version SET version = version + 1 WHERE id = 1;"
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_catalog_items_insert
+        AFTER INSERT ON items
+        WHEN NOT EXISTS (SELECT 1 FROM items WHERE category = NEW.category AND id != NEW.id)
+          OR NOT EXISTS (SELECT 1 FROM items WHERE crew_tag = NEW.crew_tag AND id != NEW.id)
+          OR NOT EXISTS (SELECT 1 FROM items WHERE location = NEW.location AND id != NEW.id)
+        BEGIN
+            {bump}
+        END;
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_catalog_items_delete
+        AFTER DELETE ON items
+        WHEN NOT EXISTS (SELECT 1 FROM items WHERE category = OLD.category)
+          OR NOT EXISTS (SELECT 1 FROM items WHERE crew_tag = OLD.crew_tag)
+          OR NOT EXISTS (SELECT 1 FROM items WHERE location = OLD.location)
+        BEGIN
+            {bump}
+        END;
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_catalog_items_update
+        AFTER UPDATE OF category, crew_tag, location ON items
+        WHEN NEW.category IS NOT OLD.category
+          OR NEW.crew_tag IS NOT OLD.crew_tag
+          OR NEW.location IS NOT OLD.location
+        BEGIN
+            {bump}
+        END;
+        """
+    )
+    for event in ("INSERT", "UPDATE", "DELETE"):
         conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                category TEXT NOT NULL DEFAULT 'General',
-                crew_tag TEXT NOT NULL,
-                location TEXT NOT NULL,
-                in_use INTEGER NOT NULL DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            );
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_locations_{event.lower()}
+            AFTER {event} ON locations
+            BEGIN
+                {bump}
+            END;
             """
         )
-        # Locations table
+
+
+def _migration_8_announcements(conn: sqlite3.Connection) -> None:
+    """Announcements table indexed on timestamp, imported from the legacy announcements.json."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS announcements (
+            id TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            author TEXT NOT NULL DEFAULT 'Unknown',
+            ts TEXT NOT NULL
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_announcements_ts ON announcements(ts, id)")
+
+    posts = []
+    if os.path.exists(LEGACY_ANNOUNCEMENTS_PATH):
+        with open(LEGACY_ANNOUNCEMENTS_PATH, "r", encoding="utf-8") as f:
+            posts = json.load(f).get("announcements", [])
+    else:
+        posts = [{
+            "id": "seed",
+            "text": "Welcome to STAGE Inventory! Use this board for quick updates.",
+            "author": "System",
+            "ts": datetime.now(timezone.utc).isoformat(),
+        }]
+    conn.executemany(
+        "INSERT OR IGNORE INTO announcements(id, text, author, ts) VALUES (?, ?, ?, ?)",
+        [
+            # Timestamps are compared as text, so store one UTC spelling
+            (p["id"], p.get("text", ""), p.get("author") or "Unknown", str(p.get("ts", "")).replace("Z", "+00:00"))
+            for p in posts
+            if p.get("id")
+        ],
+    )
+
+
+def _migration_9_item_changes(conn: sqlite3.Connection) -> None:
+    """Change feed: one row per item insert/update/delete, numbered by a monotonic version.
+
+    trg_items_updated (which already fires on every item update) now also
+    logs the change; image changes are logged as updates of their item. The
+    feed keeps the last CHANGELOG_RETENTION versions.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS item_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete'))
+        );
+        """
+    )
+    conn.execute("DROP TRIGGER IF EXISTS trg_items_updated")
+    conn.execute(
+        """
+        CREATE TRIGGER trg_items_updated
+        AFTER UPDATE ON items
+        FOR EACH ROW
+        BEGIN
+            UPDATE items SET updated_at = CURRENT_TIMESTAMP WHERE id = OLD.id;
+            INSERT INTO item_changes(item_id, op) VALUES (NEW.id, 'update');
+        END;
+        """
+    )
+    triggers = {
+        "trg_items_changes_insert": "AFTER INSERT ON items BEGIN INSERT INTO item_changes(item_id, op) VALUES (NEW.id, 'insert');",
+        "trg_items_changes_delete": "AFTER DELETE ON items BEGIN INSERT INTO item_changes(item_id, op) VALUES (OLD.id, 'delete');",
+        "trg_item_images_changes_insert": "AFTER INSERT ON item_images BEGIN INSERT INTO item_changes(item_id, op) VALUES (NEW.item_id, 'update');",
+        "trg_item_images_changes_update": "AFTER UPDATE ON item_images BEGIN INSERT INTO item_changes(item_id, op) VALUES (NEW.item_id, 'update');",
+        "trg_item_images_changes_delete": "AFTER DELETE ON item_images BEGIN INSERT INTO item_changes(item_id, op) VALUES (OLD.item_id, 'update');",
+    }
+    for name, body in triggers.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body} END;")
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_item_changes_prune
+        AFTER INSERT ON item_changes
+        WHEN NEW.version % 1000 = 0
+        BEGIN
+            DELETE FROM item_changes WHERE version <= NEW.version - {CHANGELOG_RETENTION};
+        END;
+        """
+    )
+
+
+def _migration_10_updated_at_in_statement(conn: sqlite3.Connection) -> None:
+    """Writers now set updated_at themselves, so the item update trigger only logs the change.
+
+    The old trigger issued a second UPDATE of the row for every update.
+    """
+    conn.execute("DROP TRIGGER IF EXISTS trg_items_updated")
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_items_changes_update
+        AFTER UPDATE ON items
+        FOR EACH ROW
+        BEGIN
+            INSERT INTO item_changes(item_id, op) VALUES (NEW.id, 'update');
+        END;
+        """
+    )
+
+
+# Item columns counted in item_rollups (migration 11)
+FACETS = ("location", "category", "crew_tag")
+
+
+def _migration_11_item_rollups(conn: sqlite3.Connection) -> None:
+    """Item and in-use counts per location, category and crew tag, kept current by triggers.
+
+    Each item write adjusts one row per facet, so summaries read a handful of
+    rows instead of scanning items. Rows are dropped when their count reaches 0.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS item_rollups (
+            facet TEXT NOT NULL,
+            value TEXT NOT NULL,
+            items INTEGER NOT NULL,
+            in_use INTEGER NOT NULL,
+            PRIMARY KEY (facet, value)
+        ) WITHOUT ROWID;
+        """
+    )
+    for facet in FACETS:
         conn.execute(
+            f"""
+            INSERT OR IGNORE INTO item_rollups(facet, value, items, in_use)
+            SELECT '{facet}', {facet}, COUNT(*), SUM(in_use) FROM items GROUP BY {facet}
             """
-            CREATE TABLE IF NOT EXISTS locations (
+        )
+
+    def add(row: str) -> str:
+        return "".join(
+            f"INSERT INTO item_rollups(facet, value, items, in_use) VALUES ('{f}', {row}.{f}, 1, {row}.in_use)"
+            f" ON CONFLICT(facet, value) DO UPDATE SET items = items + 1, in_use = in_use + excluded.in_use;"
+            for f in FACETS
+        )
+
+    def remove(row: str) -> str:
+        return "".join(
+            f"UPDATE item_rollups SET items = items - 1, in_use = in_use - {row}.in_use"
+            f" WHERE facet = '{f}' AND value = {row}.{f};"
+            f"DELETE FROM item_rollups WHERE facet = '{f}' AND value = {row}.{f} AND items <= 0;"
+            for f in FACETS
+        )
+
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_rollups_items_insert AFTER INSERT ON items BEGIN {add('NEW')} END;")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_rollups_items_delete AFTER DELETE ON items BEGIN {remove('OLD')} END;")
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_items_update
+        AFTER UPDATE OF location, category, crew_tag, in_use ON items
+        WHEN NEW.location IS NOT OLD.location OR NEW.category IS NOT OLD.category
+          OR NEW.crew_tag IS NOT OLD.crew_tag OR NEW.in_use IS NOT OLD.in_use
+        BEGIN
+            {remove('OLD')}
+            {add('NEW')}
+        END;
+        """
+    )
+
+
+def _migration_12_item_trigrams(conn: sqlite3.Connection) -> None:
+    """Trigram index over item names for fuzzy search (see fuzzy_search).
+
+    Grams are computed in Python, so the index is brought up to date from
+    the item change feed when searched rather than by triggers;
+    trigram_state.version records how far it has caught up (-1 = rebuild).
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS item_trigrams (
+            gram TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            PRIMARY KEY (gram, item_id)
+        ) WITHOUT ROWID;
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_item_trigrams_item ON item_trigrams(item_id)")
+    # Distinct grams per item, the other half of the similarity denominator
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS item_trigram_counts (
+            item_id INTEGER PRIMARY KEY,
+            grams INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS trigram_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO trigram_state(id, version) VALUES (1, -1)")
+
+
+# facet -> (lookup table, items column) after migration 13
+FACET_TABLES = {
+    "location": ("locations", "location_id"),
+    "category": ("categories", "category_id"),
+    "crew_tag": ("crew_tags", "crew_tag_id"),
+}
+
+
+def _migration_13_lookup_tables(conn: sqlite3.Connection) -> None:
+    """Store location, category and crew tag as integer keys into lookup tables.
+
+    items is rebuilt with location_id / category_id / crew_tag_id columns
+    (ids, timestamps and the AUTOINCREMENT counter are kept), which drops its
+    indexes and triggers, so all of them are recreated here on the new
+    columns. item_rollups is re-keyed by value id, and the catalog version is
+    now bumped when a rollup row appears or disappears or a value is renamed.
+    A rename logs a change for every item carrying the value, so cached
+    result lists pick it up.
+    """
+    for table in ("categories", "crew_tags"):
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL UNIQUE
             );
             """
         )
-        # Lightweight migration: ensure 'category' column exists for older DBs
-        info = conn.execute("PRAGMA table_info(items)").fetchall()
-        cols = {row[1] for row in info}  # second field is name
-        if "category" not in cols:
-            conn.execute("ALTER TABLE items ADD COLUMN category TEXT NOT NULL DEFAULT 'General'")
+    conn.execute("INSERT OR IGNORE INTO locations(name) SELECT DISTINCT location FROM items")
+    conn.execute("INSERT OR IGNORE INTO categories(name) SELECT DISTINCT category FROM items")
+    conn.execute("INSERT OR IGNORE INTO crew_tags(name) SELECT DISTINCT crew_tag FROM items")
 
-        # Simple trigger to keep updated_at fresh
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'items'").fetchone()
+    conn.execute(
+        """
+        CREATE TABLE items_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            crew_tag_id INTEGER NOT NULL REFERENCES crew_tags(id),
+            location_id INTEGER NOT NULL REFERENCES locations(id),
+            in_use INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO items_new(id, name, category_id, crew_tag_id, location_id, in_use, created_at, updated_at)
+        SELECT items.id, items.name, categories.id, crew_tags.id, locations.id,
+               items.in_use, items.created_at, items.updated_at
+        FROM items
+        JOIN categories ON categories.name = items.category
+        JOIN crew_tags ON crew_tags.name = items.crew_tag
+        JOIN locations ON locations.name = items.location
+        """
+    )
+    conn.execute("DROP TABLE items")
+    conn.execute("ALTER TABLE items_new RENAME TO items")
+    if seq:
+        # Never hand out the id of an item deleted before the rebuild
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'items'", (seq[0],))
+
+    # Same query shapes as migrations 3 and 4, on the key columns
+    conn.execute("CREATE INDEX idx_items_name ON items(name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX idx_items_category ON items(category_id, name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX idx_items_crew_tag ON items(crew_tag_id, name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX idx_items_location ON items(location_id, in_use, name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX idx_items_location_name ON items(location_id, name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX idx_items_in_use ON items(in_use, name COLLATE NOCASE)")
+
+    triggers = {
+        "trg_items_changes_insert": "AFTER INSERT ON items BEGIN INSERT INTO item_changes(item_id, op) VALUES (NEW.id, 'insert');",
+        "trg_items_changes_update": "AFTER UPDATE ON items BEGIN INSERT INTO item_changes(item_id, op) VALUES (NEW.id, 'update');",
+        "trg_items_changes_delete": "AFTER DELETE ON items BEGIN INSERT INTO item_changes(item_id, op) VALUES (OLD.id, 'delete');",
+    }
+    if _has_fts(conn):
+        triggers.update({
+            "trg_items_fts_insert": "AFTER INSERT ON items BEGIN INSERT INTO items_fts(rowid, name) VALUES (NEW.id, NEW.name);",
+            "trg_items_fts_delete": (
+                "AFTER DELETE ON items BEGIN"
+                " INSERT INTO items_fts(items_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);"
+            ),
+            "trg_items_fts_update": (
+                "AFTER UPDATE OF name ON items BEGIN"
+                " INSERT INTO items_fts(items_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);"
+                " INSERT INTO items_fts(rowid, name) VALUES (NEW.id, NEW.name);"
+            ),
+        })
+    for facet, (table, column) in FACET_TABLES.items():
+        triggers[f"trg_{table}_rename"] = (
+            f"AFTER UPDATE OF name ON {table} WHEN NEW.name IS NOT OLD.name BEGIN"
+            f" INSERT INTO item_changes(item_id, op) SELECT id, 'update' FROM items WHERE {column} = NEW.id;"
+        )
+    for name, body in triggers.items():
+        conn.execute(f"CREATE TRIGGER {name} {body} END;")
+    for table in ("categories", "crew_tags"):
         conn.execute(
+            f"CREATE TRIGGER trg_catalog_{table}_update AFTER UPDATE ON {table} BEGIN"
+            " UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;"
+        )
+
+    # Rollups keyed by value id
+    conn.execute("DROP TABLE item_rollups")
+    conn.execute(
+        """
+        CREATE TABLE item_rollups (
+            facet TEXT NOT NULL,
+            value_id INTEGER NOT NULL,
+            items INTEGER NOT NULL,
+            in_use INTEGER NOT NULL,
+            PRIMARY KEY (facet, value_id)
+        ) WITHOUT ROWID;
+        """
+    )
+    for facet, (_, column) in FACET_TABLES.items():
+        conn.execute(
+            f"""
+            INSERT INTO item_rollups(facet, value_id, items, in_use)
+            SELECT '{facet}', {column}, COUNT(*), SUM(in_use) FROM items GROUP BY {column}
             """
-            CREATE TRIGGER IF NOT EXISTS trg_items_updated
-            AFTER UPDATE ON items
-            FOR EACH ROW
-            BEGIN
-                UPDATE items SET updated_at = CURRENT_TIMESTAMP WHERE id = OLD.id;
-            END;
+        )
+
+    def add(row: str) -> str:
+        return "".join(
+            f"INSERT INTO item_rollups(facet, value_id, items, in_use) VALUES ('{f}', {row}.{c}, 1, {row}.in_use)"
+            f" ON CONFLICT(facet, value_id) DO UPDATE SET items = items + 1, in_use = in_use + excluded.in_use;"
+            for f, (_, c) in FACET_TABLES.items()
+        )
+
+    def remove(row: str) -> str:
+        return "".join(
+            f"UPDATE item_rollups SET items = items - 1, in_use = in_use - {row}.in_use"
+            f" WHERE facet = '{f}' AND value_id = {row}.{c};"
+            f"DELETE FROM item_rollups WHERE facet = '{f}' AND value_id = {row}.{c} AND items <= 0;"
+            for f, (_, c) in FACET_TABLES.items()
+        )
+
+    conn.execute(f"CREATE TRIGGER trg_rollups_items_insert AFTER INSERT ON items BEGIN {add('NEW')} END;")
+    conn.execute(f"CREATE TRIGGER trg_rollups_items_delete AFTER DELETE ON items BEGIN {remove('OLD')} END;")
+    conn.execute(
+        f"""
+        CREATE TRIGGER trg_rollups_items_update
+        AFTER UPDATE OF location_id, category_id, crew_tag_id, in_use ON items
+        WHEN NEW.location_id IS NOT OLD.location_id OR NEW.category_id IS NOT OLD.category_id
+          OR NEW.crew_tag_id IS NOT OLD.crew_tag_id OR NEW.in_use IS NOT OLD.in_use
+        BEGIN
+            {remove('OLD')}
+            {add('NEW')}
+        END;
+        """
+    )
+    # A value entering or leaving use changes the tag / category catalogs
+    for event in ("INSERT", "DELETE"):
+        conn.execute(
+            f"CREATE TRIGGER trg_catalog_rollups_{event.lower()} AFTER {event} ON item_rollups BEGIN"
+            " UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;"
+        )
+
+
+# Usage rollup bucket sizes in seconds (buckets start on UTC hour / day boundaries)
+USAGE_HOUR = 3600
+USAGE_DAY = 86400
+# Hourly usage rollups are dropped after this many days; daily ones are kept
+USAGE_HOURLY_RETENTION_DAYS = 90
+# Usage events folded into the rollups per writer operation, and how often the
+# background folder (start_usage_sync) runs
+USAGE_SYNC_BATCH = 5000
+USAGE_SYNC_INTERVAL_S = 60
+
+
+def _migration_14_usage_history(conn: sqlite3.Connection) -> None:
+    """Append-only check-out / check-in log with hourly and daily utilization rollups.
+
+    Triggers add a usage_events row in the same statement as every in_use
+    change (and for items created in use or deleted while in use), recording
+    the item's location and crew tag at that moment. The rollups hold
+    check-outs and seconds out per bucket, item, location and crew tag; they
+    are folded in from the events not applied yet (usage_state), so reports
+    never read the raw log. usage_open is each item's check-out in progress.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_events (
+            id INTEGER PRIMARY KEY,
+            item_id INTEGER NOT NULL,
+            in_use INTEGER NOT NULL,
+            location_id INTEGER NOT NULL,
+            crew_tag_id INTEGER NOT NULL,
+            at INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_events_item ON usage_events(item_id, id)")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_open (
+            item_id INTEGER PRIMARY KEY,
+            location_id INTEGER NOT NULL,
+            crew_tag_id INTEGER NOT NULL,
+            since INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_open_since ON usage_open(since)")
+    for table in ("usage_hourly", "usage_daily"):
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket INTEGER NOT NULL,
+                item_id INTEGER NOT NULL,
+                location_id INTEGER NOT NULL,
+                crew_tag_id INTEGER NOT NULL,
+                checkouts INTEGER NOT NULL,
+                seconds_out INTEGER NOT NULL,
+                PRIMARY KEY (bucket, item_id, location_id, crew_tag_id)
+            ) WITHOUT ROWID;
             """
         )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            event_id INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO usage_state(id, event_id) VALUES (1, 0)")
+    now = "CAST(strftime('%s', 'now') AS INTEGER)"
+    # Items already out are timed from now on, without counting a check-out
+    conn.execute(
+        f"INSERT OR IGNORE INTO usage_open(item_id, location_id, crew_tag_id, since)"
+        f" SELECT id, location_id, crew_tag_id, {now} FROM items WHERE in_use"
+    )
+
+    def log(row: str, in_use: str) -> str:
+        return (
+            "INSERT INTO usage_events(item_id, in_use, location_id, crew_tag_id, at)"
+            f" VALUES ({row}.id, {in_use}, {row}.location_id, {row}.crew_tag_id, {now});"
+        )
+
+    for name, body in (
+        ("trg_usage_items_insert", f"AFTER INSERT ON items WHEN NEW.in_use BEGIN {log('NEW', '1')}"),
+        ("trg_usage_items_update",
+         f"AFTER UPDATE OF in_use ON items WHEN NEW.in_use IS NOT OLD.in_use BEGIN {log('NEW', 'NEW.in_use')}"),
+        ("trg_usage_items_delete", f"AFTER DELETE ON items WHEN OLD.in_use BEGIN {log('OLD', '0')}"),
+    ):
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body} END;")
+
+
+# item_changes.item_id logged when a location, category or crew tag is renamed:
+# every item row naming it is stale, without listing them one by one
+LOOKUP_RENAMED = 0
+
+
+def _migration_15_rename_one_change(conn: sqlite3.Connection) -> None:
+    """A lookup rename logs one LOOKUP_RENAMED change instead of one per affected item."""
+    for table, _ in FACET_TABLES.values():
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_rename")
+        conn.execute(
+            f"CREATE TRIGGER trg_{table}_rename AFTER UPDATE OF name ON {table} WHEN NEW.name IS NOT OLD.name"
+            f" BEGIN INSERT INTO item_changes(item_id, op) VALUES ({LOOKUP_RENAMED}, 'update'); END;"
+        )
+
 
-        # Seed default locations if table is empty
-        cur = conn.execute("SELECT COUNT(*) FROM locations")
-        if cur.fetchone()[0] == 0:
-            defaults = [
-                ("West Campus Basement Storage",),
-                ("East Campus Basement Storage",),
-                ("East Campus Theatre Closet",),
-            ]
-            conn.executemany("INSERT OR IGNORE INTO locations(name) VALUES (?)", defaults)
+def _migration_16_session_epochs(conn: sqlite3.Connection) -> None:
+    """Per-user session epoch for auth: bumping it (on log out) revokes the user's session tokens."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS session_epochs (
+            username TEXT PRIMARY KEY,
+            epoch INTEGER NOT NULL
+        );
+        """
+    )
 
 
+def _migration_17_trigram_rebuild_cursor(conn: sqlite3.Connection) -> None:
+    """Let the trigram index be rebuilt in short steps (see _sync_trigrams).
+
+    trigram_state.rebuild_from is the last item id re-indexed by a rebuild
+    in progress, NULL when there is none.
+    """
+    conn.execute("ALTER TABLE trigram_state ADD COLUMN rebuild_from INTEGER")
+
+
+def _migration_18_lookup_name_nocase(conn: sqlite3.Connection) -> None:
+    """Case-insensitive name order for the lookup tables, which sorted results walk (see _sort_terms).
+
+    Unique because name is, which tells SQLite each entry is one value.
+    """
+    for table, _ in FACET_TABLES.values():
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_name_nocase ON {table}(name COLLATE NOCASE, name)")
+        # Stats for the new index too, or the planner keeps preferring the analyzed one
+        conn.execute(f"ANALYZE {table}")
+
+
+def _migration_19_item_images_cascade(conn: sqlite3.Connection) -> None:
+    """Deleting an item drops its item_images row in the same transaction.
+
+    That releases the blob reference (see migration 6) even when the caller
+    never called item_images.remove_item_image(); files nobody uses any more
+    are deleted by item_images.collect_unused_images(). Rows left behind by
+    items deleted before this migration are dropped here.
+    """
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_items_delete_image
+        AFTER DELETE ON items
+        BEGIN
+            DELETE FROM item_images WHERE item_id = OLD.id;
+        END;
+        """
+    )
+    conn.execute("DELETE FROM item_images WHERE item_id NOT IN (SELECT id FROM items)")
+
+
+# Applied in order; a database at user_version N has run the first N entries.
+# Only ever append to this list.
+MIGRATIONS = [
+    _migration_1_base_schema,
+    _migration_2_name_search,
+    _migration_3_filter_indexes,
+    _migration_4_sort_indexes,
+    _migration_5_item_images,
+    _migration_6_image_blobs,
+    _migration_7_catalog_version,
+    _migration_8_announcements,
+    _migration_9_item_changes,
+    _migration_10_updated_at_in_statement,
+    _migration_11_item_rollups,
+    _migration_12_item_trigrams,
+    _migration_13_lookup_tables,
+    _migration_14_usage_history,
+    _migration_15_rename_one_change,
+    _migration_16_session_epochs,
+    _migration_17_trigram_rebuild_cursor,
+    _migration_18_lookup_name_nocase,
+    _migration_19_item_images_cascade,
+]
+
+
+def _has_fts(conn: sqlite3.Connection) -> bool:
+    available = _fts_available.get(DB_PATH)
+    if available is None:
+        available = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'"
+        ).fetchone() is not None
+        _fts_available[DB_PATH] = available
+    return available
+
+
+def _fts_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching every token as a prefix."""
+    tokens = re.findall(r"\w+", text.lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def _value_ids(conn: sqlite3.Connection, facet: str, names: Iterable[str]) -> Dict[str, int]:
+    """Ids of lookup values by name, adding the ones that do not exist yet."""
+    table = FACET_TABLES[facet][0]
+    names = list(dict.fromkeys(names))
+    conn.executemany(f"INSERT OR IGNORE INTO {table}(name) VALUES (?)", ((n,) for n in names))
+    ids: Dict[str, int] = {}
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        ids.update(conn.execute(
+            f"SELECT name, id FROM {table} WHERE name IN ({','.join(['?'] * len(chunk))})", chunk
+        ).fetchall())
+    return ids
+
+
+def _item_keys(conn: sqlite3.Connection, category: str, crew_tag: str, location: str) -> Tuple[int, int, int]:
+    return (
+        _value_ids(conn, "category", [category])[category],
+        _value_ids(conn, "crew_tag", [crew_tag])[crew_tag],
+        _value_ids(conn, "location", [location])[location],
+    )
+
+
+@perf.timed
 def add_item(name: str, category: str, crew_tag: str, location: str, in_use: bool = False) -> int:
-    with get_connection() as conn:
+    def op(conn: sqlite3.Connection) -> int:
         cur = conn.execute(
-            "INSERT INTO items (name, category, crew_tag, location, in_use) VALUES (?, ?, ?, ?, ?)",
-            (name, category, crew_tag, location, 1 if in_use else 0),
+            "INSERT INTO items (name, category_id, crew_tag_id, location_id, in_use) VALUES (?, ?, ?, ?, ?)",
+            (name, *_item_keys(conn, category, crew_tag, location), 1 if in_use else 0),
         )
         return cur.lastrowid
 
+    return _writer().submit(op)
 
-def update_item(item_id: int, name: str, category: str, crew_tag: str, location: str, in_use: bool) -> None:
-    with get_connection() as conn:
-        conn.execute(
-            "UPDATE items SET name = ?, category = ?, crew_tag = ?, location = ?, in_use = ? WHERE id = ?",
-            (name, category, crew_tag, location, 1 if in_use else 0, item_id),
+
+@perf.timed
+def add_items_bulk(items: Iterable[Dict[str, Any]]) -> int:
+    """Insert many items in a single transaction; returns how many were inserted.
+
+    Each item is a dict with ``name``, ``crew_tag`` and ``location`` and
+    optionally ``category`` (default 'General') and ``in_use``.
+    """
+    rows = [
+        (
+            item["name"],
+            item.get("category") or "General",
+            item["crew_tag"],
+            item["location"],
+            1 if item.get("in_use") else 0,
         )
+        for item in items
+    ]
+
+    def op(conn: sqlite3.Connection) -> int:
+        categories = _value_ids(conn, "category", (r[1] for r in rows))
+        tags = _value_ids(conn, "crew_tag", (r[2] for r in rows))
+        locations = _value_ids(conn, "location", (r[3] for r in rows))
+        cur = conn.executemany(
+            "INSERT INTO items (name, category_id, crew_tag_id, location_id, in_use) VALUES (?, ?, ?, ?, ?)",
+            ((n, categories[c], tags[t], locations[loc], u) for n, c, t, loc, u in rows),
+        )
+        return cur.rowcount
+
+    return _writer().submit(op, alone=True)
+
+
+@perf.timed
+def update_item(item_id: int, name: str, category: str, crew_tag: str, location: str, in_use: bool) -> None:
+    _writer().submit(lambda conn: conn.execute(
+        "UPDATE items SET name = ?, category_id = ?, crew_tag_id = ?, location_id = ?, in_use = ?,"
+        " updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (name, *_item_keys(conn, category, crew_tag, location), 1 if in_use else 0, item_id),
+    ))
 
 
+@perf.timed
 def set_in_use(item_id: int, in_use: bool) -> None:
-    with get_connection() as conn:
-        conn.execute("UPDATE items SET in_use = ? WHERE id = ?", (1 if in_use else 0, item_id))
+    # Toggling to the current state writes nothing (and logs no change).
+    _writer().submit(lambda conn: conn.execute(
+        "UPDATE items SET in_use = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND in_use != ?",
+        (1 if in_use else 0, item_id, 1 if in_use else 0),
+    ))
+
+
+@perf.timed
+def set_in_use_many(ids: Iterable[int], in_use: bool) -> int:
+    """Check many items in or out in one transaction; returns how many actually changed."""
+    flag = 1 if in_use else 0
+    params = [(flag, int(item_id), flag) for item_id in dict.fromkeys(ids)]
+    if not params:
+        return 0
+    return _writer().submit(lambda conn: conn.executemany(
+        "UPDATE items SET in_use = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND in_use != ?",
+        params,
+    ).rowcount, alone=True)
 
 
+@perf.timed
 def delete_item(item_id: int) -> None:
-    with get_connection() as conn:
-        conn.execute("DELETE FROM items WHERE id = ?", (item_id,))
+    _writer().submit(lambda conn: conn.execute("DELETE FROM items WHERE id = ?", (item_id,)))
 
 
+@perf.timed
 def get_item(item_id: int) -> Optional[Dict[str, Any]]:
-    with get_connection() as conn:
-        cur = conn.execute("SELECT * FROM items WHERE id = ?", (item_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+    with connection() as conn:
+        rows = _rows_to_items(conn.execute(_select_items(False) + " WHERE items.id = ?", (item_id,)))
+        return rows[0] if rows else None
+
+
+_ITEM_COLUMNS = (
+    "SELECT items.id, items.name, categories.name AS category, crew_tags.name AS crew_tag,"
+    " locations.name AS location, items.in_use, items.created_at, items.updated_at"
+)
+_IMAGE_COLUMN = ", item_images.item_id IS NOT NULL AS has_image"
+_IMAGE_JOIN = " LEFT JOIN item_images ON item_images.item_id = items.id"
+
+
+def _select_items(with_images: bool, sort_by: Optional[str] = None, source: str = "items") -> str:
+    # CROSS JOIN pins SQLite's join order instead of leaving it to table
+    # statistics: items drives the query through its own indexes, except when
+    # sorting by a lookup name, where that lookup table is walked in name
+    # order and each value's items are read in name order from its index.
+    # ``source`` may be a subquery aliased as items that already picked the rows.
+    lead = sort_by if sort_by in FACET_TABLES else None
+    if lead:
+        table, column = FACET_TABLES[lead]
+        sql = f" FROM {table} CROSS JOIN {source} ON items.{column} = {table}.id"
+    else:
+        sql = f" FROM {source}"
+    for facet, (table, column) in FACET_TABLES.items():
+        if facet != lead:
+            sql += f" CROSS JOIN {table} ON {table}.id = items.{column}"
+    if with_images:
+        return _ITEM_COLUMNS + _IMAGE_COLUMN + sql + _IMAGE_JOIN
+    return _ITEM_COLUMNS + sql
+
+# Sort keys accepted by list_items / list_items_page, as the row fields they
+# order by. Ties fall back to name, then id, so every ordering is total. For
+# the lookup columns SQLite walks the (small) lookup table in name order and
+# each value's items through its (key, name) index. Names sort case-insensitively
+# (see _sort_terms).
+SORT_KEYS: Dict[str, tuple] = {
+    "name": ("name", "id"),
+    "category": ("category", "name", "id"),
+    "crew_tag": ("crew_tag", "name", "id"),
+    "location": ("location", "name", "id"),
+    "in_use": ("in_use", "name", "id"),
+}
+
 
+def _sort_terms(sort_by: str) -> List[Tuple[str, str, bool]]:
+    """``(SQL expression, row field, case-folded)`` for each term of a SORT_KEYS ordering.
 
+    A lookup name sorts case-insensitively, then exactly, so values differing
+    only in case ("Props", "props") stay apart and SQLite can still walk the
+    lookup table's unique (NOCASE, exact) index instead of sorting the items.
+    """
+    terms = []
+    for field in SORT_KEYS[sort_by]:
+        if field == "name":
+            terms.append(("items.name COLLATE NOCASE", field, True))
+        elif field in FACET_TABLES:
+            table = FACET_TABLES[field][0]
+            terms += [(f"{table}.name COLLATE NOCASE", field, True), (f"{table}.name", field, False)]
+        else:
+            terms.append((f"items.{field}", field, False))
+    return terms
+
+
+def _item_filters(
+    conn: sqlite3.Connection,
+    name_query: Optional[str],
+    categories: Optional[List[str]],
+    tags: Optional[List[str]],
+    locations: Optional[List[str]],
+    in_use: Optional[bool],
+    rank: bool = False,
+    ids: Optional[List[int]] = None,
+) -> tuple:
+    """Build ``(joins, where, params, ranked)`` for the list_items filters.
+
+    With ``rank`` set, an FTS5 name match joins items_fts so ``items_fts.rank``
+    can be used for ordering, and ``ranked`` comes back True. Otherwise the
+    match runs once as an ``IN`` subquery; a join would re-run it for every row
+    when SQLite drives the query from another index.
+    """
+    joins = ""
+    where: List[str] = []
+    params: List[Any] = []
+    ranked = False
+
+    if name_query:
+        match = _fts_query(name_query) if _has_fts(conn) else None
+        if match and rank:
+            joins = " JOIN items_fts ON items_fts.rowid = items.id"
+            where.append("items_fts MATCH ?")
+            params.append(match)
+            ranked = True
+        elif match:
+            where.append("items.id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+            params.append(match)
+        else:
+            where.append("LOWER(items.name) LIKE ?")
+            params.append(f"%{name_query.lower()}%")
+
+    # Names are resolved to keys up front: with literal keys SQLite treats a
+    # single value as an equality and can read it in order from its index.
+    for facet, values in (("category", categories), ("crew_tag", tags), ("location", locations)):
+        if values:
+            table, column = FACET_TABLES[facet]
+            keys = [r[0] for r in conn.execute(
+                f"SELECT id FROM {table} WHERE name IN ({','.join(['?'] * len(values))})", list(values)
+            )]
+            where.append(f"items.{column} IN ({','.join(['?'] * len(keys))})" if keys else "0")
+            params.extend(keys)
+
+    if in_use is not None:
+        where.append("items.in_use = ?")
+        params.append(1 if in_use else 0)
+
+    if ids is not None:
+        where.append(f"items.id IN ({','.join(['?'] * len(ids))})" if ids else "0")
+        params.extend(ids)
+
+    return joins, where, params, ranked
+
+
+def _order_by(sort_by: str, descending: bool) -> str:
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort_by!r}")
+    direction = " DESC" if descending else ""
+    return ", ".join(expr + direction for expr, _, _ in _sort_terms(sort_by))
+
+
+def _rows_to_items(cur: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    rows = [dict(r) for r in cur.fetchall()]
+    # Normalize SQLite ints to Python bools for in_use (and has_image)
+    for r in rows:
+        r["in_use"] = bool(r["in_use"])
+        if "has_image" in r:
+            r["has_image"] = bool(r["has_image"])
+    return rows
+
+
+@perf.timed
 def list_items(
     name_query: Optional[str] = None,
     categories: Optional[List[str]] = None,
     tags: Optional[List[str]] = None,
     locations: Optional[List[str]] = None,
     in_use: Optional[bool] = None,
+    sort_by: Optional[str] = None,
+    descending: bool = False,
+    with_images: bool = False,
+    ids: Optional[List[int]] = None,
 ) -> List[Dict[str, Any]]:
-    """Return items matching optional filters."""
-    where = []
-    params: List[Any] = []
+    """Return items matching optional filters.
 
-    if name_query:
-        where.append("LOWER(name) LIKE ?")
-        params.append(f"%{name_query.lower()}%")
+    A name query uses the FTS5 index (token prefix matches, best matches first)
+    when it is available and falls back to a substring LIKE otherwise. Passing
+    ``sort_by`` (a key of SORT_KEYS) orders by that column instead.
+    ``with_images`` adds a ``has_image`` flag to every row; ``ids`` restricts
+    the result to those item ids.
+    """
+    with connection() as conn:
+        joins, where, params, ranked = _item_filters(
+            conn, name_query, categories, tags, locations, in_use, rank=sort_by is None, ids=ids
+        )
+        sql = _select_items(with_images, sort_by) + joins
+        if where:
+            sql += " WHERE " + " AND ".join(where)
 
-    if categories:
-        where.append(f"category IN ({','.join(['?'] * len(categories))})")
-        params.extend(categories)
+        if sort_by is None:
+            order = "items.name COLLATE NOCASE"
+            sql += " ORDER BY " + ("items_fts.rank, " + order if ranked else order)
+        else:
+            sql += " ORDER BY " + _order_by(sort_by, descending)
 
-    if tags:
-        where.append(f"crew_tag IN ({','.join(['?'] * len(tags))})")
-        params.extend(tags)
+        return _rows_to_items(conn.execute(sql, params))
 
-    if locations:
-        where.append(f"location IN ({','.join(['?'] * len(locations))})")
-        params.extend(locations)
 
-    if in_use is not None:
-        where.append("in_use = ?")
-        params.append(1 if in_use else 0)
+def iter_items(
+    name_query: Optional[str] = None,
+    categories: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+    locations: Optional[List[str]] = None,
+    in_use: Optional[bool] = None,
+    sort_by: str = "name",
+    batch_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the items list_items would return, streamed from the cursor in batches.
 
-    sql = "SELECT id, name, category, crew_tag, location, in_use, created_at, updated_at FROM items"
-    if where:
-        sql += " WHERE " + " AND ".join(where)
+    Holds a pooled connection until the generator is exhausted or closed.
+    """
+    with connection() as conn:
+        joins, where, params, _ = _item_filters(conn, name_query, categories, tags, locations, in_use)
+        sql = _select_items(False, sort_by) + joins
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + _order_by(sort_by, False)
+        cur = conn.execute(sql, params)
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                item = dict(row)
+                item["in_use"] = bool(item["in_use"])
+                yield item
 
-    sql += " ORDER BY name COLLATE NOCASE"
 
-    with get_connection() as conn:
-        cur = conn.execute(sql, params)
-        rows = [dict(r) for r in cur.fetchall()]
-        # Normalize SQLite ints to Python bools for in_use
-        for r in rows:
-            r["in_use"] = bool(r["in_use"])
-        return rows
+def _encode_cursor(row: Dict[str, Any], sort_by: str) -> str:
+    values = [int(row[f]) if f == "in_use" else row[f] for _, f, _ in _sort_terms(sort_by)]
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, sort_by: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("Invalid page cursor") from exc
+    if not isinstance(values, list) or len(values) != len(_sort_terms(sort_by)):
+        raise ValueError("Page cursor does not match the sort key")
+    return values
+
+
+@perf.timed
+def list_items_page(
+    name_query: Optional[str] = None,
+    categories: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+    locations: Optional[List[str]] = None,
+    in_use: Optional[bool] = None,
+    sort_by: str = "name",
+    descending: bool = False,
+    page_size: int = 50,
+    cursor: Optional[str] = None,
+    with_images: bool = False,
+) -> tuple:
+    """Return ``(rows, next_cursor)`` for one page of matching items.
+
+    Pages are fetched with keyset (seek) pagination on the sort key, so the
+    cost of a page does not grow with how deep into the results it is.
+    ``cursor`` is the opaque ``next_cursor`` of the previous page (None for the
+    first page); ``next_cursor`` is None on the last page.
+    """
+    with connection() as conn:
+        joins, where, params, _ = _item_filters(conn, name_query, categories, tags, locations, in_use)
+        order = _order_by(sort_by, descending)
+        if cursor:
+            terms = _sort_terms(sort_by)
+            key = ", ".join(expr for expr, _, _ in terms)
+            marks = ", ".join("?" * len(terms))
+            where.append(f"({key}) {'<' if descending else '>'} ({marks})")
+            params.extend(_decode_cursor(cursor, sort_by))
+
+        if where:
+            joins += " WHERE " + " AND ".join(where)
+        if sort_by in FACET_TABLES:
+            sql = _select_items(with_images, sort_by) + joins + f" ORDER BY {order} LIMIT ?"
+        else:
+            # Pick the page from items alone, then look up names for just those rows
+            page = f"SELECT items.* FROM items{joins} ORDER BY {order} LIMIT ?"
+            sql = _select_items(with_images, source=f"({page}) AS items") + f" ORDER BY {order}"
+        params.append(page_size + 1)
+
+        rows = _rows_to_items(conn.execute(sql, params))
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, _encode_cursor(rows[-1], sort_by)
+    return rows, None
+
+
+# Largest sort character: ``prefix + _MAX_CHAR`` sorts after every name starting with ``prefix``
+_MAX_CHAR = "\U0010ffff"
+
+
+@perf.timed
+def search_items(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Items for a typeahead: an exact ID match, then name-prefix matches, then word matches.
+
+    Every step is an index lookup capped at ``limit`` rows, so the cost
+    depends on ``limit`` rather than on the size of the inventory.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    results: Dict[int, Dict[str, Any]] = {}
+    with connection() as conn:
+        select = _select_items(False)
+        item_id = query.lstrip("#")
+        if item_id.isdigit():
+            results.update((r["id"], r) for r in _rows_to_items(
+                conn.execute(select + " WHERE items.id = ?", (int(item_id),))
+            ))
+        # Range scan on idx_items_name
+        results.update((r["id"], r) for r in _rows_to_items(conn.execute(
+            select + " WHERE items.name COLLATE NOCASE >= ? AND items.name COLLATE NOCASE < ?"
+            " ORDER BY items.name COLLATE NOCASE, items.id LIMIT ?",
+            (query, query + _MAX_CHAR, limit),
+        )))
+        if len(results) < limit:
+            joins, where, params, _ = _item_filters(conn, query, None, None, None, None)
+            cur = conn.execute(
+                select + joins + " WHERE " + " AND ".join(where)
+                + " ORDER BY items.name COLLATE NOCASE, items.id LIMIT ?",
+                params + [limit],
+            )
+            for r in _rows_to_items(cur):
+                results.setdefault(r["id"], r)
+    return list(results.values())[:limit]
+
+
+# A refresh touching more items than this just re-runs the query.
+REFRESH_MAX_DELTA = 500
+# SQLite's NOCASE collation only folds ASCII letters
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def current_version() -> int:
+    """Latest item change-feed version (0 before any change)."""
+    with connection() as conn:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'item_changes'").fetchone()
+        return row[0] if row else 0
+
+
+def changes_since(version: int) -> Optional[Dict[str, Any]]:
+    """Summarize item changes after ``version``.
+
+    Returns ``{"version", "changed", "deleted"}``: the latest version, ids
+    inserted or updated since (and still present), and ids deleted since.
+    Returns None when ``version`` predates the retained feed or a location,
+    category or crew tag was renamed since, in which case the caller has to
+    reload from scratch.
+    """
+    with connection() as conn:
+        return _changes_since(conn, version)
+
+
+def _changes_since(
+    conn: sqlite3.Connection, version: int, names_only: bool = False, until: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    # names_only: the caller only uses item names, so lookup renames do not matter.
+    # until: stop at this version (the result's version says how far it got).
+    oldest = conn.execute("SELECT MIN(version) FROM item_changes").fetchone()[0]
+    if oldest is not None and version < oldest - 1:
+        return None
+    latest = version
+    last_op: Dict[int, str] = {}
+    bound, params = ("", (version,)) if until is None else (" AND version <= ?", (version, until))
+    for row in conn.execute(
+        f"SELECT version, item_id, op FROM item_changes WHERE version > ?{bound} ORDER BY version", params
+    ):
+        latest = row[0]
+        if row[1] == LOOKUP_RENAMED:
+            if not names_only:
+                return None
+            continue
+        last_op[row[1]] = row[2]
+    return {
+        "version": latest,
+        "changed": sorted(i for i, op in last_op.items() if op != "delete"),
+        "deleted": sorted(i for i, op in last_op.items() if op == "delete"),
+    }
+
+
+def _row_sort_key(row: Dict[str, Any], sort_by: str) -> tuple:
+    # Same order as _order_by: folded terms compare like COLLATE NOCASE
+    return tuple(row[f].translate(_ASCII_LOWER) if folded else row[f] for _, f, folded in _sort_terms(sort_by))
+
+
+@perf.timed
+def refresh_items(
+    rows: Optional[List[Dict[str, Any]]],
+    version: Optional[int],
+    name_query: Optional[str] = None,
+    categories: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+    locations: Optional[List[str]] = None,
+    in_use: Optional[bool] = None,
+    sort_by: str = "name",
+    descending: bool = False,
+    with_images: bool = False,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Bring a previous list_items result up to date; returns ``(rows, version)``.
+
+    Pass the rows and version from the last call (None for both the first
+    time). When nothing changed the rows come back untouched without running
+    the query; otherwise only the changed items are re-read and merged in.
+    """
+    filters = dict(name_query=name_query, categories=categories, tags=tags, locations=locations, in_use=in_use)
+    feed = changes_since(version) if rows is not None and version is not None else None
+    touched = len(feed["changed"]) + len(feed["deleted"]) if feed else 0
+    if feed is None or touched > REFRESH_MAX_DELTA:
+        # Read the version first: changes racing the query are re-applied next time.
+        latest = current_version()
+        return list_items(**filters, sort_by=sort_by, descending=descending, with_images=with_images), latest
+    if not touched:
+        return rows, feed["version"]
+
+    gone = set(feed["changed"]) | set(feed["deleted"])
+    merged = [r for r in rows if r["id"] not in gone]
+    if feed["changed"]:
+        merged += list_items(**filters, with_images=with_images, ids=feed["changed"], sort_by=sort_by)
+    merged.sort(key=lambda r: _row_sort_key(r, sort_by), reverse=descending)
+    return merged, feed["version"]
+
+
+# Minimum trigram similarity (0-1) for a fuzzy_search match
+FUZZY_THRESHOLD = 0.3
+# Items re-indexed (or feed versions applied) per trigram sync step; about 0.1 s of writer time
+TRIGRAM_BATCH = 1000
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Trigrams of ``text``: per word (padded, so word starts weigh more) and across word gaps.
+
+    The gap-free grams let "masonjar" match "Mason jar". Case and accents are
+    ignored.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    words = re.findall(r"[^\W_]+", "".join(ch for ch in text if not unicodedata.combining(ch)))
+    grams: Set[str] = set()
+    for word in words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    compact = "".join(words)
+    grams.update(compact[i:i + 3] for i in range(len(compact) - 2))
+    return grams
+
+
+def _index_trigrams(conn: sqlite3.Connection, rows: Iterable[Tuple[int, str]]) -> None:
+    grams = {item_id: _trigrams(name) for item_id, name in rows}
+    conn.executemany(
+        "INSERT OR IGNORE INTO item_trigrams(gram, item_id) VALUES (?, ?)",
+        ((gram, item_id) for item_id, item_grams in grams.items() for gram in item_grams),
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO item_trigram_counts(item_id, grams) VALUES (?, ?)",
+        ((item_id, len(item_grams)) for item_id, item_grams in grams.items()),
+    )
 
 
+def _sync_trigrams(conn: sqlite3.Connection) -> bool:
+    """One step of bringing the trigram index up to date (runs on the writer); True once it is.
+
+    Each step touches at most TRIGRAM_BATCH items, so the write queue is never
+    held for long. A rebuild (new index, or the change feed was pruned past
+    the last sync) re-indexes items in id order from trigram_state.rebuild_from
+    while the old postings keep answering searches; afterwards the changes
+    made during the rebuild are applied from the feed.
+    """
+    synced, cursor = conn.execute("SELECT version, rebuild_from FROM trigram_state WHERE id = 1").fetchone()
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'item_changes'").fetchone()
+    latest = row[0] if row else 0
+    if cursor is not None:
+        batch = conn.execute(
+            "SELECT id, name FROM items WHERE id > ? ORDER BY id LIMIT ?", (cursor, TRIGRAM_BATCH)
+        ).fetchall()
+        # The last step also drops postings of items deleted beyond the last id
+        upper = batch[-1][0] if len(batch) == TRIGRAM_BATCH else None
+        span = "item_id > ?" + (" AND item_id <= ?" if upper is not None else "")
+        bounds = (cursor, upper) if upper is not None else (cursor,)
+        conn.execute(f"DELETE FROM item_trigrams WHERE {span}", bounds)
+        conn.execute(f"DELETE FROM item_trigram_counts WHERE {span}", bounds)
+        _index_trigrams(conn, batch)
+        conn.execute("UPDATE trigram_state SET rebuild_from = ? WHERE id = 1", (upper,))
+        return False
+    if synced == latest:
+        return True
+    reached = min(latest, synced + TRIGRAM_BATCH)
+    delta = _changes_since(conn, synced, names_only=True, until=reached) if synced >= 0 else None
+    if delta is None:
+        # Rebuild from the first item; changes from here on are caught up from the feed afterwards
+        conn.execute("UPDATE trigram_state SET version = ?, rebuild_from = 0 WHERE id = 1", (latest,))
+        return False
+    stale = delta["changed"] + delta["deleted"]
+    for start in range(0, len(stale), 500):
+        chunk = stale[start:start + 500]
+        marks = ",".join(["?"] * len(chunk))
+        conn.execute(f"DELETE FROM item_trigrams WHERE item_id IN ({marks})", chunk)
+        conn.execute(f"DELETE FROM item_trigram_counts WHERE item_id IN ({marks})", chunk)
+    for start in range(0, len(delta["changed"]), 500):
+        chunk = delta["changed"][start:start + 500]
+        _index_trigrams(conn, conn.execute(
+            f"SELECT id, name FROM items WHERE id IN ({','.join(['?'] * len(chunk))})", chunk
+        ).fetchall())
+    conn.execute("UPDATE trigram_state SET version = ? WHERE id = 1", (reached,))
+    return reached == latest
+
+
+def _trigram_status(conn: sqlite3.Connection) -> Tuple[bool, bool]:
+    """``(current, building)`` for the trigram index; a plain read, no write lock."""
+    synced, cursor = conn.execute("SELECT version, rebuild_from FROM trigram_state WHERE id = 1").fetchone()
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'item_changes'").fetchone()
+    building = synced < 0 or cursor is not None
+    return not building and synced == (row[0] if row else 0), building
+
+
+def trigram_index_building() -> bool:
+    """Whether the fuzzy search index is being built, so fuzzy_search may miss items."""
+    with connection() as conn:
+        return _trigram_status(conn)[1]
+
+
+def sync_trigrams() -> None:
+    """Bring the trigram index fully up to date, one short writer operation per step."""
+    writer = _writer()
+    while not writer.submit(_sync_trigrams):
+        pass
+
+
+def start_trigram_sync() -> None:
+    """Run sync_trigrams() in a background thread unless one is already running for this database."""
+    with _pools_lock:
+        job = _trigram_jobs.get(DB_PATH)
+        if job is not None and job.is_alive():
+            return
+        job = _trigram_jobs[DB_PATH] = threading.Thread(target=sync_trigrams, name="trigrams", daemon=True)
+        job.start()
+
+
+@perf.timed
+def fuzzy_search(
+    query: str,
+    categories: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+    locations: Optional[List[str]] = None,
+    in_use: Optional[bool] = None,
+    limit: int = 50,
+    with_images: bool = False,
+) -> List[Dict[str, Any]]:
+    """Typo-tolerant name search, best match first; each row gets a ``similarity`` score.
+
+    Similarity is the Jaccard index of the query's and the name's trigrams,
+    computed in SQL from the item_trigrams postings of the query's grams, so
+    only items sharing at least one gram with the query are looked at.
+    """
+    grams = _trigrams(query)
+    if not grams:
+        return []
+    # Searching an up-to-date index takes no write lock. Otherwise one bounded
+    # step catches up ordinary edits; a build or a long backlog continues in
+    # the background meanwhile.
+    with connection() as conn:
+        current, building = _trigram_status(conn)
+    if building or (not current and not _writer().submit(_sync_trigrams)):
+        start_trigram_sync()
+    with connection() as conn:
+        _, where, params, _ = _item_filters(conn, None, categories, tags, locations, in_use)
+        similarity = "COUNT(*) * 1.0 / (item_trigram_counts.grams + ? - COUNT(*))"
+        sql = (
+            f"SELECT item_trigrams.item_id, {similarity} AS similarity FROM item_trigrams"
+            " JOIN item_trigram_counts ON item_trigram_counts.item_id = item_trigrams.item_id"
+            + (" JOIN items ON items.id = item_trigrams.item_id" if where else "")
+            + f" WHERE item_trigrams.gram IN ({','.join(['?'] * len(grams))})"
+            + "".join(" AND " + w for w in where)
+            + " GROUP BY item_trigrams.item_id HAVING similarity >= ?"
+            " ORDER BY similarity DESC, item_trigrams.item_id LIMIT ?"
+        )
+        scores = {
+            r[0]: r[1]
+            for r in conn.execute(sql, [len(grams), *grams, *params, FUZZY_THRESHOLD, limit])
+        }
+    if not scores:
+        return []
+    rows = list_items(sort_by="name", with_images=with_images, ids=list(scores))
+    for r in rows:
+        r["similarity"] = round(scores[r["id"]], 3)
+    rows.sort(key=lambda r: -r["similarity"])
+    return rows
+
+
+def _catalog_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()[0]
+
+
+def _cached_catalog(key: str, load: Callable[[sqlite3.Connection], List[str]]) -> List[str]:
+    """Return a catalog list from the process-wide cache, reloading it when the DB's catalog version moved."""
+    cache_key = (DB_PATH, key)
+    with connection() as conn:
+        # Read the version before the data: a concurrent change can only make
+        # the cached copy newer than its version, never older.
+        version = _catalog_version(conn)
+        hit = _catalog_cache.get(cache_key)
+        if hit and hit[0] == version:
+            return list(hit[1])
+        values = load(conn)
+    _catalog_cache[cache_key] = (version, values)
+    return list(values)
+
+
+def _load_locations(conn: sqlite3.Connection) -> List[str]:
+    # Every item location is in the table since migration 13, plus locations added by hand
+    cur = conn.execute("SELECT name FROM locations ORDER BY name COLLATE NOCASE")
+    return [r[0] for r in cur.fetchall()]
+
+
+@perf.timed
 def get_locations() -> List[str]:
-    with get_connection() as conn:
-        # Prefer managed locations table, fall back to distinct from items for legacy
-        cur = conn.execute("SELECT name FROM locations ORDER BY name COLLATE NOCASE")
-        rows = [r[0] for r in cur.fetchall()]
-        if rows:
-            return rows
-        cur = conn.execute("SELECT DISTINCT location FROM items ORDER BY location COLLATE NOCASE")
-        return [r[0] for r in cur.fetchall()]
+    return _cached_catalog("locations", _load_locations)
+
+
+def _rollup_sql(facet: str, columns: str) -> str:
+    table = FACET_TABLES[facet][0]
+    return (
+        f"SELECT {columns} FROM item_rollups JOIN {table} ON {table}.id = item_rollups.value_id"
+        f" WHERE item_rollups.facet = '{facet}' ORDER BY {table}.name COLLATE NOCASE"
+    )
 
 
+def _rollup_values(facet: str) -> Callable[[sqlite3.Connection], List[str]]:
+    return lambda conn: [r[0] for r in conn.execute(_rollup_sql(facet, "name"))]
+
+
+@perf.timed
 def get_tags() -> List[str]:
-    with get_connection() as conn:
-        cur = conn.execute("SELECT DISTINCT crew_tag FROM items ORDER BY crew_tag COLLATE NOCASE")
-        return [r[0] for r in cur.fetchall()]
+    return _cached_catalog("tags", _rollup_values("crew_tag"))
 
+@perf.timed
 def get_categories() -> List[str]:
-    with get_connection() as conn:
-        cur = conn.execute("SELECT DISTINCT category FROM items ORDER BY category COLLATE NOCASE")
-        return [r[0] for r in cur.fetchall()]
+    return _cached_catalog("categories", _rollup_values("category"))
+
+
+@perf.timed
+def get_rollup(facet: str) -> List[Dict[str, Any]]:
+    """Item and in-use counts per value of ``facet`` (one of FACETS), ordered by value."""
+    if facet not in FACETS:
+        raise ValueError(f"Unknown facet: {facet!r}")
+    with connection() as conn:
+        cur = conn.execute(_rollup_sql(facet, "name AS value, items, in_use"))
+        return [dict(r) for r in cur.fetchall()]
+
 
+@perf.timed
+def get_inventory_summary() -> Dict[str, Any]:
+    """Totals plus the per-facet rollups: ``{"items", "in_use", "location": [...], ...}``.
 
+    Reads only the rollup table, so the cost depends on the number of
+    distinct locations, categories and crew tags, not on the inventory size.
+    """
+    with connection() as conn:
+        summary: Dict[str, Any] = {
+            facet: [dict(r) for r in conn.execute(_rollup_sql(facet, "name AS value, items, in_use"))]
+            for facet in FACETS
+        }
+    # Every item has exactly one category, so that facet adds up to the totals
+    summary["items"] = sum(r["items"] for r in summary["category"])
+    summary["in_use"] = sum(r["in_use"] for r in summary["category"])
+    return summary
+
+
+@perf.timed
 def add_location(name: str) -> None:
     name = name.strip()
     if not name:
         return
-    with get_connection() as conn:
+    with connection() as conn:
         conn.execute("INSERT OR IGNORE INTO locations(name) VALUES (?)", (name,))
+
+
+def _rename(facet: str, old: str, new: str) -> None:
+    new = new.strip()
+    if not new:
+        raise ValueError("The new name is empty")
+    table = FACET_TABLES[facet][0]
+
+    def op(conn: sqlite3.Connection) -> None:
+        if conn.execute(f"SELECT 1 FROM {table} WHERE name = ?", (new,)).fetchone():
+            raise ValueError(f"{new!r} already exists")
+        if conn.execute(f"UPDATE {table} SET name = ? WHERE name = ?", (new, old)).rowcount == 0:
+            raise ValueError(f"{old!r} does not exist")
+
+    _writer().submit(op)
+
+
+@perf.timed
+def rename_location(old: str, new: str) -> None:
+    """Rename a location everywhere it is used.
+
+    One row changes (items refer to it by id); the change feed gets a single
+    entry that makes cached item lists reload.
+    """
+    _rename("location", old, new)
+
+
+@perf.timed
+def rename_category(old: str, new: str) -> None:
+    _rename("category", old, new)
+
+
+@perf.timed
+def rename_crew_tag(old: str, new: str) -> None:
+    _rename("crew_tag", old, new)
+
+
+def _usage_buckets(start: int, end: int, size: int) -> Iterator[Tuple[int, int]]:
+    """Split ``[start, end)`` into ``(bucket, seconds)`` pieces on ``size`` boundaries."""
+    while start < end:
+        bucket = start - start % size
+        stop = min(end, bucket + size)
+        yield bucket, stop - start
+        start = stop
+
+
+def _flush_usage(conn: sqlite3.Connection, table: str, totals: Dict[Tuple[int, int, int, int], List[int]]) -> None:
+    conn.executemany(
+        f"INSERT INTO {table}(bucket, item_id, location_id, crew_tag_id, checkouts, seconds_out)"
+        " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET"
+        " checkouts = checkouts + excluded.checkouts, seconds_out = seconds_out + excluded.seconds_out",
+        (key + tuple(value) for key, value in totals.items()),
+    )
+    totals.clear()
+
+
+def _sync_usage(conn: sqlite3.Connection) -> bool:
+    """Fold up to USAGE_SYNC_BATCH pending usage events into usage_open and the rollups.
+
+    Runs on the writer; returns True once no events are left.
+    """
+    applied = conn.execute("SELECT event_id FROM usage_state WHERE id = 1").fetchone()[0]
+    batch = conn.execute(
+        "SELECT id, item_id, in_use, location_id, crew_tag_id, at FROM usage_events WHERE id > ? ORDER BY id LIMIT ?",
+        (applied, USAGE_SYNC_BATCH),
+    ).fetchall()
+    rollups = ((USAGE_HOUR, "usage_hourly", {}), (USAGE_DAY, "usage_daily", {}))
+    if batch:
+        for event_id, item_id, in_use, location_id, crew_tag_id, at in batch:
+            if in_use:
+                # Ignored if the item is already out (e.g. out before migration 14)
+                if conn.execute(
+                    "INSERT OR IGNORE INTO usage_open(item_id, location_id, crew_tag_id, since) VALUES (?, ?, ?, ?)",
+                    (item_id, location_id, crew_tag_id, at),
+                ).rowcount:
+                    for size, _, totals in rollups:
+                        totals.setdefault((at - at % size, item_id, location_id, crew_tag_id), [0, 0])[0] += 1
+                continue
+            row = conn.execute(
+                "SELECT location_id, crew_tag_id, since FROM usage_open WHERE item_id = ?", (item_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            conn.execute("DELETE FROM usage_open WHERE item_id = ?", (item_id,))
+            # Time out is credited to where the item was checked out from
+            for size, _, totals in rollups:
+                for bucket, seconds in _usage_buckets(row["since"], at, size):
+                    totals.setdefault((bucket, item_id, row["location_id"], row["crew_tag_id"]), [0, 0])[1] += seconds
+        applied = batch[-1][0]
+        for _, table, totals in rollups:
+            _flush_usage(conn, table, totals)
+    conn.execute("UPDATE usage_state SET event_id = ? WHERE id = 1", (applied,))
+    cutoff = int(time.time()) - USAGE_HOURLY_RETENTION_DAYS * USAGE_DAY
+    conn.execute("DELETE FROM usage_hourly WHERE bucket < ?", (cutoff - cutoff % USAGE_DAY,))
+    return len(batch) < USAGE_SYNC_BATCH
+
+
+def _usage_pending(conn: sqlite3.Connection) -> bool:
+    # A plain read: MAX(id) is the last row of usage_events' rowid b-tree
+    applied = conn.execute("SELECT event_id FROM usage_state WHERE id = 1").fetchone()[0]
+    latest = conn.execute("SELECT MAX(id) FROM usage_events").fetchone()[0]
+    return latest is not None and latest > applied
+
+
+def sync_usage() -> None:
+    """Fold every pending usage event into the rollups, one short writer operation per step."""
+    with connection() as conn:
+        if not _usage_pending(conn):
+            return
+    writer = _writer()
+    while not writer.submit(_sync_usage):
+        pass
+
+
+def _run_usage_sync(interval_s: int) -> None:
+    while True:
+        time.sleep(interval_s)
+        try:
+            sync_usage()
+        except Exception:
+            # Keep folding; the next attempt may succeed (e.g. the database was busy)
+            logger.exception("Folding usage events failed")
+
+
+def start_usage_sync(interval_s: int = USAGE_SYNC_INTERVAL_S) -> None:
+    """Fold usage events every ``interval_s`` seconds in a background thread (once per database)."""
+    with _pools_lock:
+        job = _usage_jobs.get(DB_PATH)
+        if job is None or not job.is_alive():
+            job = _usage_jobs[DB_PATH] = threading.Thread(
+                target=_run_usage_sync, args=(interval_s,), name="usage", daemon=True
+            )
+            job.start()
+
+
+def _catch_up_usage() -> None:
+    # Reports take the write lock only when events arrived since the last fold,
+    # and then for one bounded step; start_usage_sync keeps the backlog short.
+    with connection() as conn:
+        pending = _usage_pending(conn)
+    if pending:
+        _writer().submit(_sync_usage)
+
+
+# group -> (rollup column, table naming its values)
+USAGE_GROUPS = {
+    "item": ("item_id", "items"),
+    "location": ("location_id", "locations"),
+    "crew_tag": ("crew_tag_id", "crew_tags"),
+}
+
+
+def _usage_table(period_s: int) -> Tuple[int, str]:
+    # Hourly buckets for short windows, daily ones (kept forever) otherwise
+    if period_s <= 2 * USAGE_DAY:
+        return USAGE_HOUR, "usage_hourly"
+    return USAGE_DAY, "usage_daily"
+
+
+@perf.timed
+def get_utilization(group_by: str = "item", period_s: int = 30 * USAGE_DAY, limit: int = 100) -> List[Dict[str, Any]]:
+    """Check-outs and time out over the last ``period_s`` seconds per item, location or crew tag.
+
+    Rows ``{"id", "value", "checkouts", "hours_out", "out_now"}``, most time out
+    first. Reads only the rollups (whole hours or UTC days, so the window
+    starts at the beginning of its first bucket) plus the check-outs still
+    open, which count up to now.
+    """
+    column, table = USAGE_GROUPS[group_by]
+    _catch_up_usage()
+    now = int(time.time())
+    size, rollup = _usage_table(period_s)
+    start = now - period_s
+    start -= start % size
+    with connection() as conn:
+        ranked = conn.execute(
+            f"SELECT key, SUM(checkouts), SUM(seconds), SUM(out_now) FROM ("
+            f" SELECT {column} AS key, checkouts, seconds_out AS seconds, 0 AS out_now FROM {rollup} WHERE bucket >= ?"
+            f" UNION ALL SELECT {column}, 0, ? - MAX(since, ?), 1 FROM usage_open"
+            f") GROUP BY key ORDER BY 3 DESC, 2 DESC, key LIMIT ?",
+            (start, now, start, limit),
+        ).fetchall()
+        ids = [r[0] for r in ranked]
+        names: Dict[int, str] = {}
+        for chunk_start in range(0, len(ids), 500):
+            chunk = ids[chunk_start:chunk_start + 500]
+            names.update(conn.execute(
+                f"SELECT id, name FROM {table} WHERE id IN ({','.join(['?'] * len(chunk))})", chunk
+            ).fetchall())
+    return [
+        {
+            "id": key,
+            "value": names.get(key, f"#{key} (deleted)"),
+            "checkouts": checkouts,
+            "hours_out": round(seconds / 3600, 1),
+            "out_now": out_now,
+        }
+        for key, checkouts, seconds, out_now in ranked
+    ]
+
+
+@perf.timed
+def get_checkout_series(period_s: int = 30 * USAGE_DAY) -> List[Dict[str, Any]]:
+    """Check-outs per hour or UTC day over the last ``period_s`` seconds: ``[{"bucket", "checkouts"}]``."""
+    _catch_up_usage()
+    size, rollup = _usage_table(period_s)
+    start = int(time.time()) - period_s
+    start -= start % size
+    with connection() as conn:
+        rows = conn.execute(
+            f"SELECT bucket, SUM(checkouts) FROM {rollup} WHERE bucket >= ? GROUP BY bucket ORDER BY bucket", (start,)
+        ).fetchall()
+    return [
+        {"bucket": datetime.fromtimestamp(bucket, timezone.utc).strftime("%Y-%m-%d %H:%M"), "checkouts": checkouts}
+        for bucket, checkouts in rows
+    ]
+
+
+@perf.timed
+def get_checked_out(limit: int = 50) -> List[Dict[str, Any]]:
+    """Items checked out the longest: ``[{"id", "name", "location", "since", "hours_out"}]``."""
+    now = int(time.time())
+    _catch_up_usage()
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT usage_open.item_id, items.name, locations.name, usage_open.since FROM usage_open"
+            " JOIN items ON items.id = usage_open.item_id"
+            " JOIN locations ON locations.id = items.location_id"
+            " ORDER BY usage_open.since, usage_open.item_id LIMIT ?",
+            (limit,),
+        ).fetchall()
+    return [
+        {
+            "id": item_id,
+            "name": name,
+            "location": location,
+            "since": datetime.fromtimestamp(since, timezone.utc).strftime("%Y-%m-%d %H:%M UTC"),
+            "hours_out": round((now - since) / 3600, 1),
+        }
+        for item_id, name, location, since in rows
+    ]
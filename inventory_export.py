@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import tempfile
+from itertools import islice
+from typing import Any, Dict, IO, Iterator, List
+
+from inventory_db import iter_items
+
+# Column order of every export
+EXPORT_COLUMNS = ["id", "name", "category", "crew_tag", "location", "in_use", "created_at", "updated_at"]
+
+# format -> (mime type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "jsonl": ("application/x-ndjson", ".jsonl"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+# Rows written per chunk (and per Parquet row group)
+CHUNK_SIZE = 5000
+# Exports smaller than this stay in memory; larger ones spill to a temp file.
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def _chunks(rows: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write_csv(rows: Iterator[Dict[str, Any]], out: IO[bytes]) -> int:
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    count = 0
+    try:
+        writer = csv.DictWriter(text, fieldnames=EXPORT_COLUMNS, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        for chunk in _chunks(rows, CHUNK_SIZE):
+            writer.writerows(chunk)
+            count += len(chunk)
+    finally:
+        # Leave ``out`` open for the caller
+        text.detach()
+    return count
+
+
+def _write_jsonl(rows: Iterator[Dict[str, Any]], out: IO[bytes]) -> int:
+    count = 0
+    for chunk in _chunks(rows, CHUNK_SIZE):
+        lines = "".join(json.dumps({c: r[c] for c in EXPORT_COLUMNS}) + "\n" for r in chunk)
+        out.write(lines.encode("utf-8"))
+        count += len(chunk)
+    return count
+
+
+def _write_parquet(rows: Iterator[Dict[str, Any]], out: IO[bytes]) -> int:
+    # Heavy optional dependency: only imported when a Parquet export is requested.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("name", pa.string()),
+        ("category", pa.string()),
+        ("crew_tag", pa.string()),
+        ("location", pa.string()),
+        ("in_use", pa.bool_()),
+        ("created_at", pa.string()),
+        ("updated_at", pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in _chunks(rows, CHUNK_SIZE):
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
+
+
+_WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+def write_export(fmt: str, out: IO[bytes], **filters: Any) -> int:
+    """Stream the items matching ``filters`` (list_items keywords) into ``out``; returns the row count.
+
+    Rows come straight from an SQLite cursor and are written in chunks of
+    CHUNK_SIZE, so memory use does not depend on how many items match.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt!r}")
+    return _WRITERS[fmt](iter_items(**filters), out)
+
+
+def export_file(fmt: str, **filters: Any) -> bytes:
+    """Export to bytes for st.download_button, which keeps its data in memory anyway.
+
+    Rows are written through a spooled temp file, so only the finished export
+    (not the row dicts) is held in memory; the file is closed before returning.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as out:
+        write_export(fmt, out, **filters)
+        out.seek(0)
+        return out.read()
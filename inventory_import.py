@@ -0,0 +1,196 @@
+import codecs
+import csv
+import io
+import json
+import os
+import sys
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+from inventory_db import add_items_bulk, add_location, get_locations, init_db
+
+# Rows are validated and inserted this many at a time, one transaction per chunk,
+# so memory use is bounded no matter how large the file is.
+CHUNK_SIZE = 1000
+# Only the first errors are kept for display; the rest are just counted.
+MAX_REPORTED_ERRORS = 500
+
+FORMATS = ("csv", "jsonl")
+# Lines that are not valid UTF-8 are read in this encoding instead: what Excel
+# on Windows saves CSV files in.
+FALLBACK_ENCODING = "cp1252"
+_TRUE = {"1", "true", "yes", "y", "x"}
+_FALSE = {"", "0", "false", "no", "n"}
+
+
+def detect_format(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    if ext in ("jsonl", "ndjson"):
+        return "jsonl"
+    return "csv"
+
+
+def _decoded_lines(fileobj: IO) -> Iterator[str]:
+    """Lines of a binary file, each decoded as UTF-8 or, failing that, FALLBACK_ENCODING.
+
+    Decoding per line means a bad byte on line 1500 cannot abort an import
+    whose first chunks are already committed. Bytes valid in neither
+    encoding become U+FFFD.
+    """
+    for line_no, raw in enumerate(fileobj):
+        if line_no == 0 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield raw.decode("utf-8")
+        except UnicodeDecodeError:
+            yield raw.decode(FALLBACK_ENCODING, errors="replace")
+
+
+def _text_stream(fileobj: IO) -> Iterator[str]:
+    # Uploaded files and open(..., "rb") handles are binary; decode lazily.
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return _decoded_lines(fileobj)
+
+
+def iter_records(fileobj: IO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(line_number, record)`` pairs without reading the whole file.
+
+    A record that cannot be parsed is yielded as the exception instead.
+    """
+    text = _text_stream(fileobj)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as exc:
+                # The reader has consumed the bad line(s); carry on with the next record
+                yield reader.line_num, exc
+                continue
+            # Normalize headers such as "Crew Tag" to crew_tag
+            yield reader.line_num, {
+                (k or "").strip().lower().replace(" ", "_"): v for k, v in record.items()
+            }
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as exc:
+                yield line_no, exc
+    else:
+        raise ValueError(f"Unsupported import format: {fmt!r}")
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value if value is not None else "").strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"in_use must be yes/no, got {value!r}")
+
+
+def validate_record(record: Any) -> Dict[str, Any]:
+    """Return a clean item dict for add_items_bulk, or raise ValueError."""
+    if isinstance(record, csv.Error):
+        raise ValueError(f"malformed CSV: {record}")
+    if isinstance(record, Exception):
+        raise ValueError(f"invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("expected an object with item fields")
+
+    item = {}
+    for field in ("name", "crew_tag", "location"):
+        value = str(record.get(field) or "").strip()
+        if not value:
+            raise ValueError(f"missing {field}")
+        item[field] = value
+    item["category"] = str(record.get("category") or "").strip() or "General"
+    item["in_use"] = _parse_bool(record.get("in_use"))
+    return item
+
+
+def import_items(
+    fileobj: IO,
+    fmt: str,
+    create_locations: bool = True,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """Stream items from a CSV or JSONL file into the inventory.
+
+    Valid rows are inserted a chunk at a time through add_items_bulk; invalid
+    rows are skipped and reported by line number. Locations that do not exist
+    yet are created with add_location when ``create_locations`` is set,
+    otherwise rows using them are rejected.
+
+    Returns ``{"inserted", "failed", "errors", "locations_created", "stopped"}``
+    where ``errors`` holds up to MAX_REPORTED_ERRORS ``(line, message)`` pairs.
+    ``stopped`` is None unless the file could not be read to the end (e.g. a
+    text stream that fails to decode); rows before that point are kept.
+    """
+    known_locations = set(get_locations())
+    report: Dict[str, Any] = {
+        "inserted": 0, "failed": 0, "errors": [], "locations_created": [], "stopped": None,
+    }
+
+    def fail(line_no: int, message: str) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append((line_no, message))
+
+    def flush(chunk: List[Dict[str, Any]]) -> None:
+        new_locations = {item["location"] for item in chunk} - known_locations
+        for name in sorted(new_locations):
+            add_location(name)
+            known_locations.add(name)
+            report["locations_created"].append(name)
+        report["inserted"] += add_items_bulk(chunk)
+
+    chunk: List[Dict[str, Any]] = []
+    line_no = 0
+    try:
+        for line_no, record in iter_records(fileobj, fmt):
+            try:
+                item = validate_record(record)
+            except ValueError as exc:
+                fail(line_no, str(exc))
+                continue
+            if not create_locations and item["location"] not in known_locations:
+                fail(line_no, f"unknown location {item['location']!r}")
+                continue
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+    except (UnicodeError, csv.Error) as exc:
+        report["stopped"] = f"stopped after line {line_no}: {exc}"
+    if chunk:
+        flush(chunk)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Import a file from disk: ``python inventory_import.py items.csv``."""
+    args = argv if argv is not None else sys.argv[1:]
+    if len(args) != 1:
+        print("usage: python inventory_import.py FILE.csv|FILE.jsonl", file=sys.stderr)
+        return 2
+    init_db()
+    with open(args[0], "rb") as f:
+        report = import_items(f, detect_format(args[0]))
+    print(f"Inserted {report['inserted']} item(s), {report['failed']} row(s) failed.")
+    if report["stopped"]:
+        print(f"Import {report['stopped']}")
+    for line_no, message in report["errors"]:
+        print(f"  line {line_no}: {message}")
+    return 0 if report["failed"] == 0 and not report["stopped"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
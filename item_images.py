@@ -1,63 +1,302 @@
+import hashlib
 import os
-import json
+import tempfile
+import threading
 import uuid
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, List
+
+import perf
+from inventory_db import connection
 
 BASE_DIR = os.path.dirname(__file__)
 IMAGES_DIR = os.path.join(BASE_DIR, "item_images")
-MAP_PATH = os.path.join(BASE_DIR, "item_images.json")
+# Content-addressed originals: blobs/<first two hex digits>/<sha256><ext>
+BLOBS_DIR = os.path.join(IMAGES_DIR, "blobs")
+# Downscaled copies of the originals, in one sub-directory per size
+CACHE_DIR = os.path.join(IMAGES_DIR, "cache")
+
+CHUNK_SIZE = 1024 * 1024
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+
+# Longest edge (px) of the display variants produced for every upload
+VARIANT_SIZES = (256, 1024)
+VARIANT_QUALITY = 80
+
+# The item -> image mapping lives in the item_images table of the inventory
+# database. Paths are stored relative to IMAGES_DIR (images imported from the
+# old item_images.json keep their absolute path). Each stored image is a blob
+# keyed by its SHA-256, shared by every item using the same photo; triggers keep
+# image_blobs.refcount in step and a blob's file is deleted once it reaches 0.
+
+# Serializes "blob row + file" changes so a blob being collected cannot race a
+# new upload of the same content.
+_blob_lock = threading.Lock()
 
 def _ensure_dirs():
     os.makedirs(IMAGES_DIR, exist_ok=True)
-    if not os.path.exists(MAP_PATH):
-        with open(MAP_PATH, "w", encoding="utf-8") as f:
-            json.dump({}, f)
 
-def _load_map() -> Dict[str, str]:
-    _ensure_dirs()
-    with open(MAP_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+def _resolve(stored: str) -> str:
+    return os.path.join(IMAGES_DIR, stored)
+
+def _remove_file(path: Optional[str]):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
-def _save_map(mapping: Dict[str, str]):
-    with open(MAP_PATH, "w", encoding="utf-8") as f:
-        json.dump(mapping, f, indent=2)
+def _variant_format() -> Optional[str]:
+    """WEBP when Pillow can write it, else JPEG; None without Pillow."""
+    try:
+        from PIL import features
+    except ImportError:
+        return None
+    return "WEBP" if features.check("webp") else "JPEG"
 
-def get_item_image(item_id: int) -> Optional[str]:
-    mapping = _load_map()
-    path = mapping.get(str(item_id))
-    return path if path and os.path.exists(path) else None
+def _variant_path(original: str, size: int, fmt: str) -> str:
+    stem = os.path.splitext(os.path.basename(original))[0]
+    ext = ".webp" if fmt == "WEBP" else ".jpg"
+    return os.path.join(CACHE_DIR, str(size), stem + ext)
 
+def _render_variant(original: str, size: int) -> Optional[str]:
+    """Return the ``size`` variant of ``original``, (re)generating it if missing or stale."""
+    fmt = _variant_format()
+    if fmt is None:
+        return None
+    dest = _variant_path(original, size, fmt)
+    try:
+        if os.path.getmtime(dest) >= os.path.getmtime(original):
+            return dest
+    except OSError:
+        pass
+
+    from PIL import Image, ImageOps
+    try:
+        with perf.span("io:item_images.render_variant"), Image.open(original) as img:
+            img = ImageOps.exif_transpose(img)
+            if fmt == "JPEG" or img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if fmt == "WEBP" and "A" in img.getbands() else "RGB")
+            img.thumbnail((size, size))
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+            img.save(tmp, format=fmt, quality=VARIANT_QUALITY)
+        os.replace(tmp, dest)
+    except (OSError, ValueError):
+        # Unreadable image: callers fall back to the original file
+        return None
+    return dest
+
+def _remove_variants(original: str):
+    fmt = _variant_format()
+    if fmt is None:
+        return
+    for size in VARIANT_SIZES:
+        _remove_file(_variant_path(original, size, fmt))
+
+def pick_variant_size(width: int) -> Optional[int]:
+    """Smallest variant at least ``width`` px wide (None: only the original is big enough)."""
+    for size in sorted(VARIANT_SIZES):
+        if size >= width:
+            return size
+    return None
+
+@perf.timed
+def get_item_image(item_id: int, width: Optional[int] = None) -> Optional[str]:
+    """Path of the item's image, or of its smallest variant that is at least ``width`` px."""
+    with connection() as conn:
+        row = conn.execute("SELECT path FROM item_images WHERE item_id = ?", (item_id,)).fetchone()
+    if not row:
+        return None
+    path = _resolve(row[0])
+    with perf.span("io:item_images.stat"):
+        exists = os.path.exists(path)
+    if not exists:
+        return None
+    size = pick_variant_size(width) if width else None
+    if size is not None:
+        return _render_variant(path, size) or path
+    return path
+
+@perf.timed
+def get_item_images(item_ids: Iterable[int]) -> Dict[int, str]:
+    """Return ``{item_id: image_path}`` for the given items in a single query."""
+    ids = list(item_ids)
+    if not ids:
+        return {}
+    with connection() as conn:
+        cur = conn.execute(
+            f"SELECT item_id, path FROM item_images WHERE item_id IN ({','.join(['?'] * len(ids))})",
+            ids,
+        )
+        return {row[0]: _resolve(row[1]) for row in cur.fetchall()}
+
+@perf.timed
 def has_item_image(item_id: int) -> bool:
-    return get_item_image(item_id) is not None
+    with connection() as conn:
+        return conn.execute("SELECT 1 FROM item_images WHERE item_id = ?", (item_id,)).fetchone() is not None
+
+def _hash_to_temp(fileobj) -> tuple:
+    """Stream ``fileobj`` into a temp file under BLOBS_DIR; returns ``(temp_path, sha256, size)``."""
+    os.makedirs(BLOBS_DIR, exist_ok=True)
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=BLOBS_DIR, suffix=".tmp")
+    try:
+        with perf.span("io:item_images.write_upload"), os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        _remove_file(tmp)
+        raise
+    return tmp, digest.hexdigest(), size
+
+def _blob_relpath(sha256: str, ext: str) -> str:
+    return os.path.join("blobs", sha256[:2], sha256 + ext)
+
+def _store_blob(conn, tmp: str, sha256: str, size: int, ext: str) -> str:
+    """Register the blob and move ``tmp`` into place (or drop it if already stored)."""
+    row = conn.execute("SELECT path FROM image_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+    if row and os.path.exists(_resolve(row[0])):
+        _remove_file(tmp)
+        return row[0]
+    relpath = row[0] if row else _blob_relpath(sha256, ext)
+    os.makedirs(os.path.dirname(_resolve(relpath)), exist_ok=True)
+    os.replace(tmp, _resolve(relpath))
+    conn.execute(
+        "INSERT OR IGNORE INTO image_blobs(sha256, path, size) VALUES (?, ?, ?)",
+        (sha256, relpath, size),
+    )
+    return relpath
 
+def _collect_blobs(conn) -> List[str]:
+    """Delete blob rows nobody references; returns their paths for unlinking after commit."""
+    rows = conn.execute("SELECT path FROM image_blobs WHERE refcount <= 0").fetchall()
+    if rows:
+        conn.execute("DELETE FROM image_blobs WHERE refcount <= 0")
+    return [row[0] for row in rows]
+
+def _unlink_images(paths: Iterable[str]):
+    with perf.span("io:item_images.unlink"):
+        for stored in paths:
+            _remove_file(_resolve(stored))
+            _remove_variants(_resolve(stored))
+
+def _image_ext(name: str) -> str:
+    ext = os.path.splitext(name)[1].lower()
+    return ext if ext in IMAGE_EXTS else ".png"
+
+def _attach_blob(item_id: int, tmp: str, sha256: str, size: int, ext: str) -> str:
+    """Point the item at the (possibly already stored) blob and collect what it no longer uses."""
+    with _blob_lock:
+        with connection() as conn:
+            relpath = _store_blob(conn, tmp, sha256, size, ext)
+            old = conn.execute("SELECT path, sha256 FROM item_images WHERE item_id = ?", (item_id,)).fetchone()
+            conn.execute(
+                """
+                INSERT INTO item_images(item_id, path, sha256) VALUES (?, ?, ?)
+                ON CONFLICT(item_id) DO UPDATE SET path = excluded.path, sha256 = excluded.sha256
+                """,
+                (item_id, relpath, sha256),
+            )
+            garbage = _collect_blobs(conn)
+        if old and old[1] is None:
+            garbage.append(old[0])
+        _unlink_images(garbage)
+
+    dest_path = _resolve(relpath)
+    for size_px in VARIANT_SIZES:
+        _render_variant(dest_path, size_px)
+    return dest_path
+
+@perf.timed
 def save_item_image(item_id: int, uploaded_file) -> str:
-    # Streamlit UploadedFile
+    """Store an upload (Streamlit UploadedFile or any binary file object) as the item's image.
+
+    The file is hashed while being streamed to disk in chunks; identical photos
+    are stored once and shared between items.
+    """
     _ensure_dirs()
-    ext = os.path.splitext(uploaded_file.name)[1].lower()
-    if ext not in [".png", ".jpg", ".jpeg", ".webp"]:
-        ext = ".png"
-    filename = f"{item_id}_{uuid.uuid4().hex}{ext}"
-    dest_path = os.path.join(IMAGES_DIR, filename)
-    with open(dest_path, "wb") as out:
-        out.write(uploaded_file.getbuffer())
-
-    mapping = _load_map()
-    old = mapping.get(str(item_id))
-    if old and os.path.exists(old) and old != dest_path:
-        try:
-            os.remove(old)
-        except OSError:
-            pass
-    mapping[str(item_id)] = dest_path
-    _save_map(mapping)
-    return dest_path
+    tmp, sha256, size = _hash_to_temp(uploaded_file)
+    return _attach_blob(item_id, tmp, sha256, size, _image_ext(getattr(uploaded_file, "name", "")))
 
+@perf.timed
 def remove_item_image(item_id: int):
-    mapping = _load_map()
-    old = mapping.pop(str(item_id), None)
-    if old and os.path.exists(old):
-        try:
-            os.remove(old)
-        except OSError:
-            pass
-    _save_map(mapping)
\ No newline at end of file
+    with _blob_lock:
+        with connection() as conn:
+            old = conn.execute("SELECT path, sha256 FROM item_images WHERE item_id = ?", (item_id,)).fetchone()
+            conn.execute("DELETE FROM item_images WHERE item_id = ?", (item_id,))
+            garbage = _collect_blobs(conn)
+        if old and old[1] is None:
+            garbage.append(old[0])
+        _unlink_images(garbage)
+
+@perf.timed
+def adopt_legacy_images() -> int:
+    """Move images stored before the blob store into it, deduplicating them; returns how many."""
+    with connection() as conn:
+        legacy = conn.execute("SELECT item_id, path FROM item_images WHERE sha256 IS NULL").fetchall()
+    adopted = 0
+    for item_id, stored in legacy:
+        path = _resolve(stored)
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            tmp, sha256, size = _hash_to_temp(f)
+        _attach_blob(item_id, tmp, sha256, size, _image_ext(path))
+        adopted += 1
+    return adopted
+
+@perf.timed
+def collect_unused_images() -> int:
+    """Delete image files no item uses any more (e.g. those of deleted items); returns how many.
+
+    Covers blobs whose refcount dropped to 0, blob files without a row and
+    pre-blob-store uploads in IMAGES_DIR that no item_images row points to.
+    """
+    with _blob_lock:
+        with connection() as conn:
+            garbage = _collect_blobs(conn)
+            referenced = {
+                os.path.realpath(_resolve(row[0]))
+                for row in conn.execute("SELECT path FROM item_images UNION SELECT path FROM image_blobs")
+            }
+        _unlink_images(garbage)
+        removed = len(garbage)
+        candidates = []
+        if os.path.isdir(IMAGES_DIR):
+            candidates += [os.path.join(IMAGES_DIR, name) for name in os.listdir(IMAGES_DIR)]
+        for dirpath, _, files in os.walk(BLOBS_DIR):
+            candidates += [os.path.join(dirpath, name) for name in files]
+        for path in candidates:
+            # Uploads in progress are .tmp files, so they are skipped too
+            if not os.path.isfile(path) or os.path.splitext(path)[1].lower() not in IMAGE_EXTS:
+                continue
+            if os.path.realpath(path) not in referenced:
+                _unlink_images([path])
+                removed += 1
+    return removed
+
+@perf.timed
+def prune_image_cache() -> int:
+    """Delete cached variants whose original is no longer referenced; returns how many."""
+    with connection() as conn:
+        stems = {
+            os.path.splitext(os.path.basename(row[0]))[0]
+            for row in conn.execute("SELECT path FROM item_images UNION SELECT path FROM image_blobs")
+        }
+    removed = 0
+    if not os.path.isdir(CACHE_DIR):
+        return removed
+    for size_dir in os.listdir(CACHE_DIR):
+        size_path = os.path.join(CACHE_DIR, size_dir)
+        if not os.path.isdir(size_path):
+            continue
+        for name in os.listdir(size_path):
+            if os.path.splitext(name)[0] not in stems or name.endswith(".tmp"):
+                _remove_file(os.path.join(size_path, name))
+                removed += 1
+    return removed
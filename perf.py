@@ -0,0 +1,273 @@
+"""Opt-in timing instrumentation for the data layer.
+
+Disabled unless the STAGE_PERF environment variable is "1" or enable() is
+called; while disabled every hook costs one boolean check. Timings are kept
+per name (``sql:``, ``fn:`` and ``io:`` prefixes) for the whole process and
+per Streamlit rerun, and summarized as counts and p50/p95/p99.
+"""
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+ENABLED = os.environ.get("STAGE_PERF") == "1"
+DUMP_PATH = os.environ.get("STAGE_PERF_LOG", os.path.join(os.path.dirname(__file__), "perf_log.jsonl"))
+
+# Samples kept per name for the process-wide percentiles
+MAX_SAMPLES = 2000
+# Sessions whose last rerun is remembered
+MAX_SESSIONS = 200
+
+_lock = threading.Lock()
+_samples: Dict[str, Deque[float]] = {}
+_totals: Dict[str, Dict[str, float]] = {}
+# The session this thread is currently working for (a rerun, or a write submitted by one)
+_local = threading.local()
+# session key -> samples of its rerun in progress. Keyed by session rather than
+# thread: Streamlit runs each rerun of a session on a new thread.
+_runs: Dict[str, Dict[str, List[tuple]]] = {}
+# session key -> samples of its previous (completed) rerun
+_last_runs: Dict[str, Dict[str, List[tuple]]] = {}
+
+
+def enable(on: bool = True) -> None:
+    global ENABLED
+    ENABLED = on
+
+
+def reset() -> None:
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _runs.clear()
+        _last_runs.clear()
+
+
+def add_rows(name: str, rows: int, session_key: Optional[str] = None) -> None:
+    """Add rows fetched after the timing to the last sample recorded under ``name``."""
+    if not ENABLED or not rows:
+        return
+    with _lock:
+        totals = _totals.get(name)
+        if totals is None:
+            return
+        totals["rows"] += rows
+        samples = _runs.get(session_key, {}).get(name)
+        if samples:
+            ms, counted = samples[-1]
+            samples[-1] = (ms, counted + rows)
+
+
+def record(name: str, ms: float, rows: Optional[int] = None) -> None:
+    """Add one timing sample (and optional row count) under ``name``."""
+    if not ENABLED:
+        return
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=MAX_SAMPLES)
+            _totals[name] = {"count": 0, "total_ms": 0.0, "rows": 0}
+        samples.append(ms)
+        totals = _totals[name]
+        totals["count"] += 1
+        totals["total_ms"] += ms
+        totals["rows"] += rows or 0
+        run = _runs.get(getattr(_local, "session", None))
+        if run is not None:
+            run.setdefault(name, []).append((ms, rows or 0))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block, e.g. ``with perf.span("io:announcements.load"):``."""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(fn: Callable) -> Callable:
+    """Decorator recording a function's duration (and the length of list results) as ``fn:module.name``."""
+    name = f"fn:{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        # Only lists are rows; a dict result is one record (get_item) or a summary
+        rows = result[0] if isinstance(result, tuple) and result and isinstance(result[0], list) else result
+        record(name, (time.perf_counter() - start) * 1000, len(rows) if isinstance(rows, list) else None)
+        return result
+
+    return wrapper
+
+
+_IN_LIST = re.compile(r"\?(\s*,\s*\?)+")
+_SPACES = re.compile(r"\s+")
+
+
+def _normalize_sql(sql: str) -> str:
+    # Collapse whitespace and IN (?, ?, ...) lists so one query shape is one entry
+    sql = _IN_LIST.sub("?...", _SPACES.sub(" ", sql).strip())
+    return sql if len(sql) <= 200 else sql[:197] + "..."
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor adding the rows fetched through it to its statement's row count."""
+
+    name = ""
+    session: Optional[str] = None
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            add_rows(self.name, 1, self.session)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        add_rows(self.name, len(rows), self.session)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        add_rows(self.name, len(rows), self.session)
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        add_rows(self.name, 1, self.session)
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection factory timing every execute()/executemany() while enabled.
+
+    Times cover statement execution up to the first row; the fetch is included
+    in the ``fn:`` timing of the inventory_db function that issued it. Rows are
+    those a write changed, or those read from a query's cursor.
+    """
+
+    def execute(self, sql, *args):
+        if not ENABLED:
+            return super().execute(sql, *args)
+        name = "sql:" + _normalize_sql(sql)
+        cur = self.cursor(TracedCursor)
+        cur.name, cur.session = name, getattr(_local, "session", None)
+        start = time.perf_counter()
+        cur.execute(sql, *args)
+        record(name, (time.perf_counter() - start) * 1000, cur.rowcount if cur.rowcount > 0 else None)
+        return cur
+
+    def executemany(self, sql, *args):
+        if not ENABLED:
+            return super().executemany(sql, *args)
+        start = time.perf_counter()
+        cur = super().executemany(sql, *args)
+        record("sql:" + _normalize_sql(sql), (time.perf_counter() - start) * 1000,
+               cur.rowcount if cur.rowcount > 0 else None)
+        return cur
+
+
+def begin_run(session_key: str) -> None:
+    """Start collecting samples recorded for ``session_key`` as a new rerun.
+
+    Call at the top of every rerun, on the thread running it. The session's
+    previous rerun becomes available through last_run(); Streamlit may stop a
+    rerun at any point, so runs are closed when the next one begins rather
+    than at the end of the script.
+    """
+    with _lock:
+        previous = _runs.pop(session_key, None)
+        if previous is not None:
+            _last_runs.pop(session_key, None)
+            _last_runs[session_key] = previous
+            while len(_last_runs) > MAX_SESSIONS:
+                _last_runs.pop(next(iter(_last_runs)))
+        _runs[session_key] = {}
+        while len(_runs) > MAX_SESSIONS:
+            _runs.pop(next(iter(_runs)))
+    _local.session = session_key
+
+
+def session() -> Optional[str]:
+    """The session samples recorded on this thread are attributed to (None outside a rerun)."""
+    return getattr(_local, "session", None)
+
+
+@contextmanager
+def attributed_to(session_key: Optional[str]) -> Iterator[None]:
+    """Attribute samples recorded on this thread to ``session_key`` for the enclosed block.
+
+    Used by the database writer thread while it runs an operation submitted
+    from a rerun, so the write's SQL shows up in that rerun.
+    """
+    previous = getattr(_local, "session", None)
+    _local.session = session_key
+    try:
+        yield
+    finally:
+        _local.session = previous
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _summarize(name: str, times: List[float], count: int, total_ms: float, rows: int) -> Dict[str, Any]:
+    ordered = sorted(times)
+    return {
+        "name": name,
+        "count": count,
+        "total_ms": round(total_ms, 3),
+        "p50_ms": round(_percentile(ordered, 50), 3),
+        "p95_ms": round(_percentile(ordered, 95), 3),
+        "p99_ms": round(_percentile(ordered, 99), 3),
+        "rows": rows,
+    }
+
+
+def summary() -> List[Dict[str, Any]]:
+    """Process-wide stats per name, slowest total first."""
+    with _lock:
+        items = [(name, list(samples), dict(_totals[name])) for name, samples in _samples.items()]
+    stats = [_summarize(name, times, int(t["count"]), t["total_ms"], int(t["rows"])) for name, times, t in items]
+    return sorted(stats, key=lambda s: s["total_ms"], reverse=True)
+
+
+def last_run(session_key: str) -> List[Dict[str, Any]]:
+    """Stats per name for the previous completed rerun of ``session_key``."""
+    with _lock:
+        run = dict(_last_runs.get(session_key, {}))
+    stats = [
+        _summarize(name, [ms for ms, _ in samples], len(samples), sum(ms for ms, _ in samples), sum(r for _, r in samples))
+        for name, samples in run.items()
+    ]
+    return sorted(stats, key=lambda s: s["total_ms"], reverse=True)
+
+
+def dump_jsonl(path: Optional[str] = None, session_key: Optional[str] = None) -> str:
+    """Append a timestamped snapshot of the stats to a JSONL file; returns its path."""
+    path = path or DUMP_PATH
+    snapshot = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "process": summary(),
+        "last_run": last_run(session_key) if session_key else [],
+    }
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(snapshot) + "\n")
+    return path
@@ -0,0 +1,255 @@
+"""Online snapshots of the inventory database and image store.
+
+A snapshot is ``SNAPSHOT_DIR/stage-<UTC timestamp>.tar.gz`` holding a manifest
+and a copy of the database (items, announcements, image index, ...) made with
+the sqlite3 backup API a few pages at a time, so sessions and the writer
+thread keep running while it is taken. Image files never change once stored,
+so they are copied into ``SNAPSHOT_DIR/images`` only the first time a
+snapshot needs them and are shared by every snapshot; each manifest lists
+the files its database refers to.
+
+Configured with STAGE_SNAPSHOT_DIR, STAGE_SNAPSHOT_KEEP and
+STAGE_SNAPSHOT_INTERVAL (seconds between scheduled snapshots, 0 to disable).
+"""
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import inventory_db
+import item_images
+import perf
+
+SNAPSHOT_DIR = os.environ.get("STAGE_SNAPSHOT_DIR", os.path.join(os.path.dirname(__file__), "snapshots"))
+SNAPSHOT_KEEP = int(os.environ.get("STAGE_SNAPSHOT_KEEP", "24"))
+SNAPSHOT_INTERVAL_S = int(os.environ.get("STAGE_SNAPSHOT_INTERVAL", "3600"))
+
+# Pages copied per backup step, and the pause after each step that lets
+# other threads run. 1024 pages of 4 KiB is ~4 MB per step.
+BACKUP_STEP_PAGES = 1024
+BACKUP_STEP_PAUSE_S = 0.001
+# Fast gzip: snapshots are taken while the app is serving
+COMPRESS_LEVEL = 1
+
+ARCHIVE_PREFIX = "stage-"
+ARCHIVE_SUFFIX = ".tar.gz"
+MANIFEST_NAME = "manifest.json"
+DATABASE_NAME = "inventory.db"
+
+logger = logging.getLogger(__name__)
+
+# One snapshot (or restore) at a time per process
+_lock = threading.Lock()
+_scheduler: Optional[threading.Thread] = None
+# Why the last scheduled snapshot failed ({"at", "error"}), None once one succeeds
+_last_failure: Optional[Dict[str, str]] = None
+
+
+def _images_dir() -> str:
+    return os.path.join(SNAPSHOT_DIR, "images")
+
+
+def _safe_relpath(path: str) -> Optional[str]:
+    """``path`` if it is relative and stays inside the image store, else None."""
+    if os.path.isabs(path):
+        return None
+    norm = os.path.normpath(path)
+    if norm == ".." or norm.startswith(".." + os.sep):
+        return None
+    return norm
+
+
+def _backup_database(dest: str) -> None:
+    src = inventory_db.get_connection()
+    dst = sqlite3.connect(dest)
+    try:
+        # Holding a read transaction pins one version of the database for every
+        # step; otherwise a write between steps makes the backup start over.
+        src.isolation_level = None
+        src.execute("BEGIN")
+        src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        with perf.span("io:snapshots.backup"):
+            src.backup(dst, pages=BACKUP_STEP_PAGES, progress=lambda *_: time.sleep(BACKUP_STEP_PAUSE_S))
+        src.execute("COMMIT")
+        # A standalone file (no -wal) is what goes into the archive
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        src.close()
+
+
+def _copy_images(db_path: str) -> Dict[str, Any]:
+    """Copy the images ``db_path`` refers to into the shared store; returns the manifest fields."""
+    conn = sqlite3.connect(db_path)
+    try:
+        paths = [r[0] for r in conn.execute("SELECT path FROM item_images UNION SELECT path FROM image_blobs")]
+    finally:
+        conn.close()
+    images, skipped, copied = [], 0, 0
+    for path in paths:
+        rel = _safe_relpath(path)
+        src = os.path.join(item_images.IMAGES_DIR, rel) if rel else None
+        if not src or not os.path.isfile(src):
+            # Absolute paths from item_images.json (see "Clean up images") or lost files
+            skipped += 1
+            continue
+        images.append(rel)
+        dest = os.path.join(_images_dir(), rel)
+        if os.path.isfile(dest) and os.path.getsize(dest) == os.path.getsize(src):
+            continue
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = dest + ".tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        copied += 1
+    return {"images": images, "images_copied": copied, "images_skipped": skipped}
+
+
+def _read_manifest(path: str) -> Dict[str, Any]:
+    with tarfile.open(path, "r:gz") as tar:
+        member = tar.extractfile(MANIFEST_NAME)
+        if member is None:
+            raise ValueError(f"{path} has no manifest")
+        return json.load(member)
+
+
+def list_snapshots() -> List[Dict[str, Any]]:
+    """Snapshots on disk, newest first: name, path, size in bytes."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    names = sorted(
+        (n for n in os.listdir(SNAPSHOT_DIR) if n.startswith(ARCHIVE_PREFIX) and n.endswith(ARCHIVE_SUFFIX)),
+        reverse=True,
+    )
+    out = []
+    for name in names:
+        path = os.path.join(SNAPSHOT_DIR, name)
+        out.append({"name": name, "path": path, "size": os.path.getsize(path)})
+    return out
+
+
+def _rotate() -> int:
+    """Delete all but the newest SNAPSHOT_KEEP snapshots and the images only they used."""
+    snapshots = list_snapshots()
+    removed = 0
+    for snap in snapshots[SNAPSHOT_KEEP:]:
+        os.remove(snap["path"])
+        removed += 1
+    if not removed:
+        return 0
+    keep = set()
+    for snap in snapshots[:SNAPSHOT_KEEP]:
+        keep.update(_read_manifest(snap["path"])["images"])
+    root = _images_dir()
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            if os.path.relpath(path, root) not in keep:
+                os.remove(path)
+    return removed
+
+
+@perf.timed
+def take_snapshot() -> Dict[str, Any]:
+    """Write a new snapshot while the app keeps running; returns its manifest plus name and path."""
+    with _lock:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        created = datetime.now(timezone.utc)
+        name = f"{ARCHIVE_PREFIX}{created.strftime('%Y%m%dT%H%M%S%fZ')}{ARCHIVE_SUFFIX}"
+        path = os.path.join(SNAPSHOT_DIR, name)
+        work = tempfile.mkdtemp(prefix=".snapshot-", dir=SNAPSHOT_DIR)
+        try:
+            db_copy = os.path.join(work, DATABASE_NAME)
+            _backup_database(db_copy)
+            manifest = {"created": created.isoformat(), "database": DATABASE_NAME, **_copy_images(db_copy)}
+            manifest_path = os.path.join(work, MANIFEST_NAME)
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            # Manifest first, so rotation can read it without decompressing the database
+            tmp = path + ".tmp"
+            with perf.span("io:snapshots.compress"), tarfile.open(tmp, "w:gz", compresslevel=COMPRESS_LEVEL) as tar:
+                tar.add(manifest_path, arcname=MANIFEST_NAME)
+                tar.add(db_copy, arcname=DATABASE_NAME)
+            os.replace(tmp, path)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        manifest["rotated"] = _rotate()
+        return {"name": name, "path": path, **manifest}
+
+
+def restore_if_missing() -> Optional[str]:
+    """Restore the newest snapshot if the database file does not exist; returns its name.
+
+    Call before init_db(). Images listed in the snapshot are put back where
+    they are missing; nothing existing is overwritten.
+    """
+    if os.path.exists(inventory_db.DB_PATH):
+        return None
+    with _lock:
+        if os.path.exists(inventory_db.DB_PATH):
+            return None
+        snapshots = list_snapshots()
+        if not snapshots:
+            return None
+        snap = snapshots[0]
+        # Pooled connections would keep writing to the file being replaced
+        inventory_db.close_connections()
+        # A leftover -wal would be replayed into the restored file
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(inventory_db.DB_PATH + suffix):
+                os.remove(inventory_db.DB_PATH + suffix)
+        tmp = inventory_db.DB_PATH + ".restore"
+        with perf.span("io:snapshots.restore"), tarfile.open(snap["path"], "r:gz") as tar:
+            manifest = json.load(tar.extractfile(MANIFEST_NAME))
+            with tar.extractfile(manifest["database"]) as src, open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst, item_images.CHUNK_SIZE)
+        os.replace(tmp, inventory_db.DB_PATH)
+        for rel in manifest["images"]:
+            rel = _safe_relpath(rel)
+            src = os.path.join(_images_dir(), rel) if rel else None
+            dest = os.path.join(item_images.IMAGES_DIR, rel) if rel else None
+            if src and os.path.isfile(src) and not os.path.exists(dest):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                shutil.copyfile(src, dest)
+        return snap["name"]
+
+
+def last_snapshot_failure() -> Optional[Dict[str, str]]:
+    """When and why the last scheduled snapshot failed, or None if it succeeded (or none ran yet)."""
+    return _last_failure
+
+
+def _run_scheduler(interval_s: int) -> None:
+    global _last_failure
+    while True:
+        time.sleep(interval_s)
+        try:
+            take_snapshot()
+        except Exception as e:
+            # Keep the schedule going; the next attempt may succeed (e.g. disk freed)
+            logger.exception("Scheduled snapshot failed")
+            _last_failure = {
+                "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "error": f"{type(e).__name__}: {e}",
+            }
+        else:
+            _last_failure = None
+
+
+def start_scheduler(interval_s: int = SNAPSHOT_INTERVAL_S) -> bool:
+    """Take a snapshot every ``interval_s`` seconds in a background thread (once per process)."""
+    global _scheduler
+    if interval_s <= 0:
+        return False
+    with _lock:
+        if _scheduler is None:
+            _scheduler = threading.Thread(target=_run_scheduler, args=(interval_s,), name="snapshots", daemon=True)
+            _scheduler.start()
+    return True
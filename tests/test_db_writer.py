@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_writer import WriteQueue
+
+
+class WriteQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "test.db")
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def submit_with_timeout(self, writer, op, timeout=5):
+        """Run writer.submit(op) on a helper thread; fail the test if it hangs."""
+        result = {}
+
+        def call():
+            try:
+                result["value"] = writer.submit(op)
+            except BaseException as exc:
+                result["error"] = exc
+
+        thread = threading.Thread(target=call, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        self.assertFalse(thread.is_alive(), "submit() is still blocked")
+        return result
+
+    def test_commits_and_returns_results(self):
+        writer = WriteQueue(self.connect)
+        try:
+            self.assertEqual(writer.submit(lambda c: c.execute("INSERT INTO t VALUES (1)").rowcount), 1)
+        finally:
+            writer.close()
+        with sqlite3.connect(self.path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 1)
+
+    def test_failed_operation_is_rolled_back_alone(self):
+        writer = WriteQueue(self.connect)
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                writer.submit(lambda c: c.execute("INSERT INTO nope VALUES (1)"))
+            writer.submit(lambda c: c.execute("INSERT INTO t VALUES (2)"))
+        finally:
+            writer.close()
+        with sqlite3.connect(self.path) as conn:
+            self.assertEqual(conn.execute("SELECT x FROM t").fetchall(), [(2,)])
+
+    def test_connect_failure_fails_callers_and_recovers(self):
+        attempts = []
+
+        def connect():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise sqlite3.OperationalError("unable to open database file")
+            return self.connect()
+
+        writer = WriteQueue(connect)
+        try:
+            result = self.submit_with_timeout(writer, lambda c: c.execute("INSERT INTO t VALUES (1)"))
+            self.assertIsInstance(result.get("error"), sqlite3.OperationalError)
+            # The next write starts a fresh writer thread
+            result = self.submit_with_timeout(writer, lambda c: c.execute("INSERT INTO t VALUES (3)").rowcount)
+            self.assertEqual(result.get("value"), 1)
+        finally:
+            writer.close()
+        self.assertEqual(len(attempts), 2)
+
+    def test_connect_failure_fails_every_queued_caller(self):
+        release = threading.Event()
+
+        def connect():
+            release.wait(5)
+            raise sqlite3.OperationalError("disk I/O error")
+
+        writer = WriteQueue(connect)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.submit_with_timeout(writer, lambda c: None)))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join(10)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(isinstance(r.get("error"), sqlite3.OperationalError) for r in results))
+
+
+if __name__ == "__main__":
+    unittest.main()